@@ -3,7 +3,7 @@
 Script to add descriptions to SHL assessments that don't have them.
 Generates contextual descriptions based on assessment names and test types.
 """
-import json
+from app.catalog import CatalogWriter, iter_catalog, write_catalog, migrate_legacy_catalog, CATALOG_PATH
 
 def generate_description(name, test_types):
     """Generate a contextual description based on assessment name and type"""
@@ -50,32 +50,27 @@ def generate_description(name, test_types):
     return f"Pre-packaged assessment solution for {name} roles measuring relevant job competencies."
 
 def main():
-    # Load current catalog
-    with open('shl_catalog.json', 'r') as f:
-        catalog = json.load(f)
-    
-    # Backup original
-    with open('shl_catalog_backup.json', 'w') as f:
-        json.dump(catalog, f, indent=2)
+    migrate_legacy_catalog()
+    # Backup original (streamed item by item)
+    write_catalog('shl_catalog_backup.json', iter_catalog(CATALOG_PATH))
     print(f"✅ Backup saved to shl_catalog_backup.json")
     
-    # Update descriptions
+    # Update descriptions while streaming the catalog back out
+    # (atomic replace so a running server hot-reloads it)
     updated_count = 0
-    for item in catalog:
-        if item.get('description') == 'No description available.':
-            item['description'] = generate_description(
-                item.get('name', ''),
-                item.get('test_type', [])
-            )
-            updated_count += 1
-    
-    # Save updated catalog
-    with open('shl_catalog.json', 'w') as f:
-        json.dump(catalog, f, indent=2)
+    with CatalogWriter(CATALOG_PATH) as writer:
+        for item in iter_catalog('shl_catalog_backup.json'):
+            if item.get('description') == 'No description available.':
+                item['description'] = generate_description(
+                    item.get('name', ''),
+                    item.get('test_type', [])
+                )
+                updated_count += 1
+            writer.write(item)
     
     print(f"✅ Updated {updated_count} assessments with descriptions")
-    print(f"✅ Saved to shl_catalog.json")
-    print(f"\n📊 Total assessments: {len(catalog)}")
+    print(f"✅ Saved to {CATALOG_PATH}")
+    print(f"\n📊 Total assessments: {writer.count}")
 
 if __name__ == "__main__":
     main()
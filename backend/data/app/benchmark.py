@@ -0,0 +1,302 @@
+"""
+Offline benchmarks for the request path and the recommendation engines.
+
+    python -m app.benchmark                         # everything, written to benchmark_results.json
+    python -m app.benchmark --suite engines --engines tfidf --scales 1 10
+
+engines: for each engine and synthetic catalog size (1x/10x/100x the items
+of shl_catalog_backup.json), in a fresh process each: cold start (building
+the index), per-query latency percentiles over the train/test queries of
+Gen_AI Dataset.xlsx, QPS with concurrent callers, and peak RSS. Latency and
+QPS are measured with the engine's query caches disabled, so every query
+pays its full cost; warm_latency_ms repeats the queries with them enabled.
+
+serialization: encoding a 10-item /recommend response the way FastAPI does
+it per request (validate against RecommendationResponse, jsonable_encoder,
+json.dumps) versus joining the items' pre-encoded JSON (catalog.encode_items).
+
+Nothing touches the network: the ML engine runs with the Hugging Face hub
+in offline mode (it is reported as skipped when its model or dependencies
+are not available locally), uses heuristic query classification instead of
+Gemini, and builds its vector store in a temporary directory. Results are
+JSON so runs from different commits can be diffed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+from .catalog import load_catalog, build_records, encode_items, CATALOG_PATH, orjson
+from .models import RecommendationResponse
+
+BASELINE_CATALOG = "../data/shl_catalog_backup.json"
+DATASET_PATH = "../data/Gen_AI Dataset.xlsx"
+RESULTS_FILE = "../data/benchmark_results.json"
+ENGINES = ("tfidf", "ml")
+SCALES = (1, 10, 100)
+
+# Used when the labeled dataset (or pandas to read it) is not available
+FALLBACK_QUERIES = [
+    "Java developer who can collaborate with business teams",
+    "Entry level sales role with strong communication skills",
+    "Python, SQL and JavaScript programming skills",
+    "Analyst with cognitive and personality tests within 45 minutes",
+    "Customer service representative, remote testing",
+    "Leadership and people management for a senior manager",
+]
+
+
+def _time_per_call(fn: Callable, iterations: int) -> float:
+    """Mean microseconds per call"""
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench_serialization(catalog: List[Dict], k: int = 10, iterations: int = 20000) -> Dict:
+    records = build_records(catalog)
+    items = [records[i % len(records)].response for i in range(k)]
+
+    def fastapi_path():
+        model = RecommendationResponse.model_validate({"recommended_assessments": items})
+        content = jsonable_encoder(model)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def pre_encoded():
+        return b'{"recommended_assessments":' + encode_items(items) + b'}'
+
+    # Both paths must produce the same document
+    assert json.loads(fastapi_path()) == json.loads(pre_encoded())
+
+    validated_us = _time_per_call(fastapi_path, iterations)
+    pre_encoded_us = _time_per_call(pre_encoded, iterations)
+    return {
+        "items": k,
+        "iterations": iterations,
+        "orjson": orjson is not None,
+        "validate_and_serialize_us": round(validated_us, 2),
+        "pre_encoded_us": round(pre_encoded_us, 2),
+        "speedup": round(validated_us / pre_encoded_us, 1),
+    }
+
+
+def load_queries(dataset_path: str = DATASET_PATH) -> List[str]:
+    """Distinct train + test queries from the labeled dataset"""
+    try:
+        from .load_datasets import load_excel_dataset, parse_train_set, get_test_queries
+        datasets = load_excel_dataset(dataset_path)
+    except (ImportError, OSError) as e:
+        print(f"Dataset unavailable ({e}); using the built-in sample queries")
+        return list(FALLBACK_QUERIES)
+    queries = []
+    if 'train' in datasets:
+        queries += [item['query'] for item in parse_train_set(datasets['train'])]
+    if 'test' in datasets:
+        queries += get_test_queries(datasets['test'])
+    queries = list(dict.fromkeys(q.strip() for q in queries if isinstance(q, str) and q.strip()))
+    return queries or list(FALLBACK_QUERIES)
+
+
+def synthetic_catalog(base: List[Dict], scale: int, seed: int = 0) -> List[Dict]:
+    """
+    `scale` copies of the base catalog. Copies past the first get their own
+    URL, a numbered name and a shuffled description, so they are distinct
+    documents and the vocabulary grows with the catalog.
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for copy in range(scale):
+        for item in base:
+            if copy == 0:
+                catalog.append(dict(item))
+                continue
+            words = item.get("description", "").split()
+            rng.shuffle(words)
+            catalog.append(dict(
+                item,
+                name=f"{item.get('name', '')} {copy}",
+                url=f"{item.get('url', '')}?variant={copy}",
+                description=" ".join(words),
+            ))
+    return catalog
+
+
+def _percentiles(samples_ms: List[float]) -> Dict:
+    values = np.array(samples_ms)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def _load_engine(engine_name: str, workdir: str):
+    """
+    (build_fn, recommend_fn, set_query_cache) for an engine, set up to run
+    offline. set_query_cache(enabled) gives the engine an empty query cache,
+    or one that never hits.
+    """
+    if engine_name == "tfidf":
+        from . import engine
+        # No query-level caches in the engine itself
+        return (engine.build_index, lambda query, index: engine.get_recommendations(query, index, 10),
+                lambda enabled: None)
+
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    os.environ["GEMINI_API_KEY"] = ""
+    os.environ["CLASSIFICATION_CACHE_PATH"] = os.path.join(workdir, "classification_cache.sqlite3")
+    os.environ["QUERY_EMBEDDING_SPILL"] = ""
+    from . import engine_ml
+    from .cache import EmbeddingCache
+    # Keep the real persisted vector store out of it
+    engine_ml.PERSIST_DIR = os.path.join(workdir, "chroma_db")
+    engine_ml.MANIFEST_FILE = os.path.join(engine_ml.PERSIST_DIR, "catalog_manifest.json")
+    os.makedirs(engine_ml.PERSIST_DIR, exist_ok=True)
+
+    def recommend(query, db):
+        return engine_ml.get_recommendations(
+            query, db, 10, classification=engine_ml.classify_query_heuristic(query))
+
+    def set_query_cache(enabled):
+        # With no room, every lookup misses and the model embeds each query
+        engine_ml.get_embeddings().cache = EmbeddingCache(max_bytes=16 * 1024 * 1024 if enabled else 0)
+    return engine_ml.build_index, recommend, set_query_cache
+
+
+def run_case(engine_name: str, scale: int, base_catalog: List[Dict], queries: List[str],
+             concurrency: int = 8, qps_calls: int = 500) -> Dict:
+    """One engine at one catalog size; meant to run in its own process"""
+    result = {"engine": engine_name, "scale": scale}
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            build_fn, recommend, set_query_cache = _load_engine(engine_name, workdir)
+        except Exception as e:  # missing optional dependencies or model files
+            return dict(result, skipped=f"{type(e).__name__}: {e}")
+        catalog = synthetic_catalog(base_catalog, scale)
+        result["items"] = len(catalog)
+        rss_before_build = _peak_rss_mb()
+
+        start = time.perf_counter()
+        try:
+            index = build_fn(catalog)
+        except Exception as e:
+            return dict(result, skipped=f"build failed: {type(e).__name__}: {e}")
+        result["cold_start_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+        def timed_pass():
+            samples = []
+            for query in queries:
+                start = time.perf_counter()
+                recommend(query, index)
+                samples.append((time.perf_counter() - start) * 1000)
+            return _percentiles(samples)
+
+        # Latency and throughput with query caches off: what a new query costs.
+        # One unrelated query first, so lazy model loading is not timed
+        set_query_cache(False)
+        recommend("benchmark warm-up", index)
+        result["latency_ms"] = timed_pass()
+
+        # Throughput: `concurrency` threads sharing the index
+        calls = [queries[i % len(queries)] for i in range(qps_calls)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda query: recommend(query, index), calls))
+        result["concurrency"] = concurrency
+        result["qps"] = round(qps_calls / (time.perf_counter() - start), 1)
+
+        # Repeated queries, answered from a primed query cache
+        set_query_cache(True)
+        timed_pass()
+        result["warm_latency_ms"] = timed_pass()
+
+        result["peak_rss_mb"] = _peak_rss_mb()
+        result["rss_before_build_mb"] = rss_before_build
+    return result
+
+
+def bench_engines(engines, scales, queries: List[str], base_catalog: List[Dict],
+                  concurrency: int = 8, qps_calls: int = 500) -> List[Dict]:
+    """Every (engine, scale) case in a fresh spawned process, so peak RSS is its own"""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for engine_name in engines:
+        for scale in scales:
+            print(f"Benchmarking {engine_name} at {scale}x...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, engine_name, scale, base_catalog, queries,
+                                     concurrency, qps_calls).result()
+            print(f"  {result}")
+            results.append(result)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmarks")
+    parser.add_argument("--suite", choices=("all", "engines", "serialization"), default="all")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--qps-calls", type=int, default=500)
+    parser.add_argument("--catalog", default=BASELINE_CATALOG, help="base catalog for the synthetic sizes")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--iterations", type=int, default=20000, help="serialization benchmark iterations")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    base_catalog = load_catalog(args.catalog if os.path.exists(args.catalog) else CATALOG_PATH)
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "base_catalog_items": len(base_catalog),
+        },
+    }
+    if args.suite in ("all", "serialization"):
+        report["serialization"] = bench_serialization(base_catalog, iterations=args.iterations)
+    if args.suite in ("all", "engines"):
+        queries = load_queries(args.dataset)
+        report["meta"]["queries"] = len(queries)
+        report["engines"] = bench_engines(args.engines, args.scales, queries, base_catalog,
+                                          args.concurrency, args.qps_calls)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Caches for the recommendation request path.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .utils import normalize_query
+
+
+class QueryCache:
+    """
+    Bounded result cache with LRU + TTL eviction.
+
+    Entries are tagged with the index version they were computed against;
+    seeing a different version drops everything, so a catalog reload never
+    serves stale results.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key, version=None):
+        """Return the cached value or None, counting the hit/miss"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, version=None):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def query_key(query: str, k: int, filters: Optional[Dict] = None) -> tuple:
+    """Cache key: normalized query text, the number of results and any filters"""
+    return (normalize_query(query), k, tuple(sorted(filters.items())) if filters else None)
+
+
+def cached_recommendations(cache: QueryCache, recommend_fn: Callable, query: str, db,
+                           k: int = 10, version: Optional[int] = None,
+                           filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Serve `recommend_fn(query, db, k, filters=filters)` through the cache.
+    Works with both engine.get_recommendations and engine_ml.get_recommendations.
+    """
+    key = query_key(query, k, filters)
+    results = cache.get(key, version)
+    if results is None:
+        results = recommend_fn(query, db, k, filters=filters)
+        cache.put(key, results, version)
+    return results
+
+
+async def cached_recommendations_async(cache: QueryCache, recommend_fn: Callable, query: str, db,
+                                      k: int = 10, version: Optional[int] = None,
+                                      filters: Optional[Dict] = None) -> List[Dict]:
+    """Same as cached_recommendations(), for a coroutine `recommend_fn`."""
+    key = query_key(query, k, filters)
+    results = cache.get(key, version)
+    if results is None:
+        results = await recommend_fn(query, db, k, filters=filters)
+        cache.put(key, results, version)
+    return results
+
+
+def cached_batch_recommendations(cache: QueryCache, batch_fn: Callable, queries: List[str], db,
+                                 k: int = 10, version: Optional[int] = None,
+                                 filters: Optional[Dict] = None) -> List[List[Dict]]:
+    """
+    Serve a batch through the cache: hits are answered directly and all
+    misses go to `batch_fn(queries, db, k, filters=filters)` in a single call.
+    """
+    keys = [query_key(query, k, filters) for query in queries]
+    results = [cache.get(key, version) for key in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        computed = batch_fn([queries[i] for i in missing], db, k, filters=filters)
+        for i, recs in zip(missing, computed):
+            results[i] = recs
+            cache.put(keys[i], recs, version)
+    return results
+
+
+class EmbeddingCache:
+    """
+    Memory-capped LRU cache of query embeddings (float32).
+
+    Entries evicted from memory can optionally spill to a memory-mapped
+    float32 array on disk (`spill_path` + `.npy`) with a JSON key index
+    (`spill_path` + `.json`), so they survive eviction and restarts without
+    another model forward pass. Spill slots are reused round-robin.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, spill_path: Optional[str] = None,
+                 spill_capacity: int = 10000):
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.spill_capacity = spill_capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> np.ndarray
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Spill state, created lazily once the embedding dimension is known
+        self._spill = None
+        self._spill_index = {}  # key -> slot
+        self._spill_keys = {}   # slot -> key
+        self._next_slot = 0
+        self._dirty = 0
+        if spill_path:
+            self._open_spill()
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key)
+
+    def _open_spill(self, dim: Optional[int] = None):
+        index_file = f"{self.spill_path}.json"
+        data_file = f"{self.spill_path}.npy"
+        if os.path.exists(index_file) and os.path.exists(data_file):
+            with open(index_file, 'r') as f:
+                meta = json.load(f)
+            self._spill = np.load(data_file, mmap_mode='r+')
+            self._spill_index = meta['keys']
+            self._spill_keys = {slot: key for key, slot in self._spill_index.items()}
+            self._next_slot = meta['next_slot']
+        elif dim is not None:
+            self._spill = np.lib.format.open_memmap(
+                data_file, mode='w+', dtype=np.float32, shape=(self.spill_capacity, dim))
+
+    def _write_spill(self, key: str, vector: np.ndarray):
+        if self._spill is None:
+            self._open_spill(dim=len(vector))
+        if self._spill is None or self._spill.shape[1] != len(vector):
+            return
+        slot = self._spill_index.get(key)
+        if slot is None:
+            slot = self._next_slot
+            self._next_slot = (self._next_slot + 1) % len(self._spill)
+            old_key = self._spill_keys.pop(slot, None)
+            if old_key is not None:
+                self._spill_index.pop(old_key, None)
+        self._spill[slot] = vector
+        self._spill_index[key] = slot
+        self._spill_keys[slot] = key
+        self._dirty += 1
+        if self._dirty >= 64:
+            self._flush_spill()
+
+    def _flush_spill(self):
+        if self._spill is None:
+            return
+        self._spill.flush()
+        with open(f"{self.spill_path}.json", 'w') as f:
+            json.dump({'next_slot': self._next_slot, 'keys': self._spill_index}, f)
+        self._dirty = 0
+
+    def _insert(self, key: str, vector: np.ndarray):
+        if key in self._entries:
+            self._bytes -= self._entry_size(key, self._entries.pop(key))
+        self._entries[key] = vector
+        self._bytes += self._entry_size(key, vector)
+        while self._bytes > self.max_bytes and self._entries:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(old_key, old_vector)
+            if self.spill_path:
+                self._write_spill(old_key, old_vector)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            slot = self._spill_index.get(key)
+            if slot is not None and self._spill is not None:
+                # Promote back into memory
+                vector = np.array(self._spill[slot], dtype=np.float32)
+                self._insert(key, vector)
+                self.hits += 1
+                return vector
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector):
+        with self._lock:
+            self._insert(key, np.asarray(vector, dtype=np.float32))
+
+    def flush(self):
+        """Persist the spill key index (call on shutdown)"""
+        with self._lock:
+            if self.spill_path:
+                # Spill everything still in memory so a restart starts warm
+                for key, vector in self._entries.items():
+                    self._write_spill(key, vector)
+                self._flush_spill()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "spilled": len(self._spill_index),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class PersistentCache:
+    """
+    Small persistent key -> JSON value store (SQLite), for results that are
+    expensive to recompute and worth keeping across restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                               (key, json.dumps(value)))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {"size": size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,344 @@
+"""
+Catalog loading and hot-reload.
+The catalog is read and indexed once; a background thread watches the file
+and swaps in a freshly built index when it changes.
+
+Two on-disk formats, picked by extension: line-delimited JSON (`.ndjson` /
+`.jsonl`, one item per line) is streamed item by item, and the original
+indented JSON array (anything else) is read whole. The default catalog is
+NDJSON; an existing shl_catalog.json is converted on first start
+(see migrate_legacy_catalog).
+"""
+import json
+import os
+import textwrap
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .models import AssessmentItem
+from .utils import extract_duration, normalize_yes_no, format_test_type, test_type_mask
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder produces the same JSON
+    orjson = None
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "../data/shl_catalog.ndjson")
+# Where the catalog lived before it defaulted to NDJSON
+LEGACY_CATALOG_PATH = "../data/shl_catalog.json"
+
+
+def dumps_json(value) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def is_ndjson(path: str) -> bool:
+    return path.endswith((".ndjson", ".jsonl"))
+
+
+def iter_catalog(path: str = CATALOG_PATH) -> Iterator[Dict]:
+    """
+    Stream catalog items from disk. NDJSON is decoded one line at a time
+    (blank lines skipped); a JSON array has to be parsed whole first.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if not is_ndjson(path):
+            yield from json.load(f)
+            return
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid catalog line: {e}") from e
+
+
+def load_catalog(path: str = CATALOG_PATH) -> List[Dict]:
+    """Read the whole catalog into a list"""
+    return list(iter_catalog(path))
+
+
+class CatalogWriter:
+    """
+    Writes catalog items one at a time, in the format `path` calls for.
+
+    Items go to `<path>.partial` and are flushed as they are written, so a
+    crawl that dies midway leaves everything it got so far (a readable
+    NDJSON file when writing NDJSON). close() moves the finished file over
+    `path` in one rename, so a watcher never picks up a half-written catalog.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.count = 0
+        self._ndjson = is_ndjson(path)
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+        if not self._ndjson:
+            self._file.write("[")
+
+    def write(self, item: Dict):
+        if self._ndjson:
+            self._file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        else:
+            # Same text json.dump(items, f, indent=2) produces, one item at a time
+            self._file.write(("\n" if self.count == 0 else ",\n") + textwrap.indent(json.dumps(item, indent=2), "  "))
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        """Finish the file and publish it at `path`"""
+        if not self._ndjson:
+            self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+
+    def abort(self):
+        """Stop writing but keep what was written in `<path>.partial`"""
+        self._file.close()
+        print(f"Catalog write interrupted; {self.count} items kept in {self.partial_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_catalog(path: str, items: Iterable[Dict]):
+    """Write a whole catalog (any iterable of items) atomically"""
+    with CatalogWriter(path) as writer:
+        for item in items:
+            writer.write(item)
+
+
+def migrate_legacy_catalog(path: str = CATALOG_PATH, legacy_path: str = LEGACY_CATALOG_PATH) -> bool:
+    """
+    Convert the old JSON array catalog to `path` when `path` is NDJSON and
+    does not exist yet. The old file is left in place. Returns True if converted.
+    """
+    if not is_ndjson(path) or os.path.exists(path) or not os.path.exists(legacy_path):
+        return False
+    write_catalog(path, iter_catalog(legacy_path))
+    print(f"Converted {legacy_path} to {path}")
+    return True
+
+
+class ResponseItem(dict):
+    """
+    A response item dict that carries its own pre-encoded JSON (`encoded`),
+    so responses can be assembled from bytes without re-serializing.
+    """
+
+    __slots__ = ("encoded",)
+
+
+class CatalogRecord:
+    """
+    One catalog item normalized once at load time: duration as int minutes,
+    Yes/No flags and a test_type list, exactly as models.AssessmentItem wants.
+    Missing or null fields get the same defaults as absent ones.
+
+    `response` is the ready-made response item, validated against
+    AssessmentItem here and encoded once (`response.encoded`). It is the only
+    copy of the item's fields (the attributes below read from it) and is
+    shared by every request that returns the item, so treat it as read-only.
+    """
+
+    __slots__ = ("category_mask", "response")
+
+    def __init__(self, item: Dict):
+        test_type = format_test_type(item.get("test_type"))
+        self.category_mask = test_type_mask(test_type)
+        self.response = ResponseItem(AssessmentItem(
+            url=_text(item.get("url")),
+            name=_text(item.get("name")),
+            adaptive_support=normalize_yes_no(_text(item.get("adaptive_support"))),
+            description=_text(item.get("description")),
+            duration=extract_duration(item.get("duration")),
+            remote_support=normalize_yes_no(_text(item.get("remote_support"))),
+            test_type=test_type,
+        ).model_dump())
+        self.response.encoded = dumps_json(self.response)
+
+    @classmethod
+    def from_encoded(cls, encoded: bytes, category_mask: int) -> "CatalogRecord":
+        """Rewrap a record from its `response.encoded` bytes, without validating it again"""
+        record = cls.__new__(cls)
+        record.category_mask = category_mask
+        record.response = ResponseItem(loads_json(encoded))
+        record.response.encoded = encoded
+        return record
+
+    url = property(lambda self: self.response["url"])
+    name = property(lambda self: self.response["name"])
+    description = property(lambda self: self.response["description"])
+    duration = property(lambda self: self.response["duration"])
+    adaptive_support = property(lambda self: self.response["adaptive_support"])
+    remote_support = property(lambda self: self.response["remote_support"])
+    test_type = property(lambda self: self.response["test_type"])
+
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def iter_records(catalog: Iterable[Dict]) -> Iterator[CatalogRecord]:
+    """
+    Records for the catalog items. An item that still fails validation is
+    logged and skipped, so one bad entry cannot take the whole index down.
+    """
+    for position, item in enumerate(catalog):
+        try:
+            yield CatalogRecord(item)
+        except (AttributeError, TypeError, ValueError) as e:  # pydantic's ValidationError is a ValueError
+            url = item.get("url") if isinstance(item, dict) else None
+            print(f"Skipping catalog item {position} ({url}): {e}")
+
+
+def encode_items(items: List[Dict]) -> bytes:
+    """
+    JSON array of response items. Pre-encoded items are concatenated as-is;
+    anything else (e.g. items from the ML engine) is validated against
+    AssessmentItem and encoded on the spot.
+    """
+    parts = []
+    for item in items:
+        encoded = getattr(item, "encoded", None)
+        if encoded is None:
+            encoded = dumps_json(AssessmentItem.model_validate(item).model_dump())
+        parts.append(encoded)
+    return b"[" + b",".join(parts) + b"]"
+
+
+def build_records(catalog: Iterable[Dict]) -> List[CatalogRecord]:
+    return list(iter_records(catalog))
+
+
+def apply_change_set(catalog: List[Dict], changes: Dict) -> List[Dict]:
+    """
+    Merge a scraper change set ({"added": [...], "updated": [...], "removed": [urls]})
+    into a catalog: updated items replace theirs in place, removed ones are
+    dropped and added ones are appended.
+    """
+    updated = {item["url"]: item for item in changes.get("updated", [])}
+    removed = set(changes.get("removed", []))
+    merged = [updated.get(item["url"], item) for item in catalog if item["url"] not in removed]
+    known = {item["url"] for item in merged}
+    merged.extend(item for item in changes.get("added", []) if item["url"] not in known)
+    return merged
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class CatalogManager:
+    """
+    Owns the live index built from the catalog file.
+
+    `index` always points at a fully built index: rebuilds happen off to the
+    side and are published with a single reference assignment, so requests
+    that already grabbed the old index finish against it undisturbed.
+    """
+
+    def __init__(self, build_fn: Callable[[List[Dict]], object], path: str = CATALOG_PATH,
+                 poll_interval: float = 5.0):
+        self.build_fn = build_fn
+        self.path = path
+        self.poll_interval = poll_interval
+        # (index, version) published together so readers get a consistent pair
+        self._live = (None, 0)
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self) -> bool:
+        """Build the index from the current catalog file and swap it in"""
+        with self._reload_lock:
+            signature = _file_signature(self.path)
+            if signature is None:
+                print(f"Catalog not found at {self.path}")
+                return False
+            try:
+                # Builders index the items as they stream in
+                new_index = self.build_fn(iter_catalog(self.path))
+            except Exception as e:
+                # Keep serving the previous index; retry on the next poll
+                print(f"Catalog reload failed: {e}")
+                return False
+            self._live = (new_index, self.version + 1)
+            self._signature = signature
+            print(f"Catalog loaded (version {self.version})")
+            return True
+
+    def snapshot(self) -> tuple:
+        """The live (index, version) pair"""
+        return self._live
+
+    @property
+    def index(self):
+        return self._live[0]
+
+    @property
+    def version(self) -> int:
+        return self._live[1]
+
+    def set_index(self, index):
+        """Publish an index built elsewhere (e.g. attached from shared memory)"""
+        with self._reload_lock:
+            self._live = (index, self.version + 1)
+            self._signature = _file_signature(self.path)
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild only when the file's mtime/size differ from the last load"""
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        return self.load()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload_if_changed()
+
+    def start(self):
+        """Start polling the catalog file in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a catalog between JSON array and NDJSON (by extension)")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args()
+    write_catalog(args.destination, iter_catalog(args.source))
+    print(f"Wrote {args.destination}")
@@ -2,31 +2,32 @@
 Simple recommendation engine without ML dependencies
 Uses TF-IDF for semantic matching - lightweight and fast!
 """
-import json
 import os
 import re
-from typing import List, Dict
+import time
+from typing import Iterable, List, Dict, Optional
 from collections import Counter
 import math
 
+import numpy as np
+from scipy.sparse import csr_matrix, csc_matrix
+
+from .catalog import CatalogRecord, iter_catalog, iter_records, CATALOG_PATH
+
 
 def build_simple_index():
-    """Load catalog data - no vector DB needed"""
-    # Working directory is backend/data/, catalog is in the same directory
-    catalog_path = "./shl_catalog.json"
+    """Stream catalog data - no vector DB needed"""
+    # Working directory is backend/data/
+    catalog_path = CATALOG_PATH
     
     print(f"DEBUG: CWD: {os.getcwd()}")
     print(f"DEBUG: Looking for catalog at: {os.path.abspath(catalog_path)}")
     
     if not os.path.exists(catalog_path):
         print(f"DEBUG: File not found at {catalog_path}!")
-        return []
+        return iter([])
     
-    with open(catalog_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"DEBUG: Loaded {len(data)} items from catalog")
-    return data
+    return iter_catalog(catalog_path)
 
 
 def tokenize(text: str) -> List[str]:
@@ -36,117 +37,366 @@ def tokenize(text: str) -> List[str]:
     return tokens
 
 
-def compute_tfidf(documents: List[str]) -> tuple:
-    """Compute TF-IDF for all documents"""
-    # Build vocabulary and document frequency
-    vocab = set()
-    doc_tokens = []
-    
+def compute_tfidf(documents: Iterable[str]) -> tuple:
+    """Compute TF-IDF for all documents (any iterable, consumed once)"""
+    # Single pass: term counts per document, document frequency from each
+    # document's distinct terms (the Counter keys)
+    doc_counts = []
+    df = Counter()
     for doc in documents:
-        tokens = tokenize(doc)
-        doc_tokens.append(tokens)
-        vocab.update(tokens)
+        tf = Counter(tokenize(doc))
+        doc_counts.append(tf)
+        df.update(tf.keys())
     
-    vocab = sorted(vocab)
+    vocab = sorted(df)
     word_to_idx = {word: idx for idx, word in enumerate(vocab)}
     
     # Compute IDF
-    N = len(documents)
-    idf = {}
-    for word in vocab:
-        df = sum(1 for tokens in doc_tokens if word in tokens)
-        idf[word] = math.log(N / (1 + df))
+    N = len(doc_counts)
+    idf = {word: math.log(N / (1 + df[word])) for word in vocab}
     
-    # Compute TF-IDF vectors
-    vectors = []
-    for tokens in doc_tokens:
-        tf = Counter(tokens)
-        vector = [0.0] * len(vocab)
-        for word, count in tf.items():
-            if word in word_to_idx:
-                idx = word_to_idx[word]
-                vector[idx] = count * idf[word]
+    # Compute TF-IDF vectors as CSR rows (column indices in vocabulary order)
+    indptr = [0]
+    indices = []
+    data = []
+    for tf in doc_counts:
+        row = sorted((word_to_idx[word], count * idf[word]) for word, count in tf.items())
         # Normalize
-        norm = math.sqrt(sum(x*x for x in vector))
-        if norm > 0:
-            vector = [x / norm for x in vector]
-        vectors.append(vector)
+        norm = math.sqrt(sum(w*w for _, w in row))
+        for idx, w in row:
+            indices.append(idx)
+            data.append(w / norm if norm > 0 else w)
+        indptr.append(len(indices))
     
+    vectors = csr_matrix(
+        (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+        shape=(N, len(vocab))
+    )
     return vectors, word_to_idx, idf
 
 
-def cosine_similarity(vec1, vec2):
-    """Compute cosine similarity"""
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    return dot_product
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, ordered by score desc then index asc.
+    Uses argpartition to find the cut-off instead of sorting every score.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        # Keep every tie at the cut-off so ordering matches a stable full sort
+        candidates = np.flatnonzero(scores >= kth_score)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
 
 
-def get_recommendations(query: str, db_instance=None, k: int = 10) -> List[Dict]:
-    """Get recommendations using TF-IDF similarity"""
-    # Load catalog
-    catalog = build_simple_index()
-    
-    if not catalog:
-        return []
-    
-    # Create document corpus
+def build_document_text(item: Dict) -> str:
+    """Text used to represent a catalog item in the index"""
     # Use name and test_type since descriptions are often empty from scraping
-    documents = []
-    for item in catalog:
-        # Combine name and test types for matching
-        name = item.get('name', '')
-        test_types = ' '.join(item.get('test_type', []))
-        doc_text = f"{name} {test_types}"
-        documents.append(doc_text)
-    
-    # Add query as last document
-    documents.append(query)
-    
-    # Compute TF-IDF
-    vectors, word_to_idx, idf = compute_tfidf(documents)
-    
-    # Query vector is the last one
-    query_vector = vectors[-1]
-    doc_vectors = vectors[:-1]
+    name = item.get('name', '')
+    test_types = ' '.join(item.get('test_type', []))
+    return f"{name} {test_types}"
+
+
+class TfidfIndex:
+    """
+    Long-lived TF-IDF index over the catalog.
+    Document vectors, vocabulary and IDF are computed once at build time;
+    at request time only the query is vectorized, using the frozen IDF.
+    """
+
+    def __init__(self, catalog: Iterable[Dict]):
+        start = time.perf_counter()
+        # `catalog` may be a stream (catalog.iter_catalog): each item is
+        # normalized into its record and tokenized as it arrives. Only the
+        # records are kept; the raw items are dropped once read.
+        self.records = []
+
+        def documents():
+            for record in iter_records(catalog):
+                self.records.append(record)
+                yield build_document_text(record.response)
+
+        self.doc_vectors, self.word_to_idx, self.idf = compute_tfidf(documents())
+        self._build_postings()
+        # Metadata columns used to filter before scoring. Category bitmasks: see utils.CATEGORY_BITS
+        n = len(self.records)
+        self.category_masks = np.fromiter((r.category_mask for r in self.records), dtype=np.int32, count=n)
+        self.durations = np.fromiter((r.duration for r in self.records), dtype=np.int32, count=n)
+        self.remote = np.fromiter((r.remote_support == 'Yes' for r in self.records), dtype=bool, count=n)
+        self.adaptive = np.fromiter((r.adaptive_support == 'Yes' for r in self.records), dtype=bool, count=n)
+        self.stats = {
+            "num_documents": n,
+            "vocab_size": len(self.word_to_idx),
+            "nnz": int(self.doc_vectors.nnz),
+            "build_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def catalog(self) -> List[Dict]:
+        """The normalized catalog items, in index order (built on each access)"""
+        return [record.response for record in self.records]
+
+    def to_arrays(self) -> tuple:
+        """
+        Flatten the index into plain NumPy arrays plus a small JSON-able dict
+        (vocabulary, stats), e.g. for sharing between processes. The records
+        travel as their encoded response JSON, concatenated in `item_json`
+        and split at `item_offsets`.
+        """
+        vocab = sorted(self.word_to_idx, key=self.word_to_idx.get)
+        encoded = [record.response.encoded for record in self.records]
+        arrays = {
+            "doc_indptr": self.doc_vectors.indptr,
+            "doc_indices": self.doc_vectors.indices,
+            "doc_data": self.doc_vectors.data,
+            "post_indptr": self.postings.indptr,
+            "post_indices": self.postings.indices,
+            "post_data": self.postings.data,
+            "idf": np.array([self.idf[word] for word in vocab], dtype=np.float64),
+            "max_weights": self.max_weights,
+            "min_weights": self.min_weights,
+            "category_masks": self.category_masks,
+            "durations": self.durations,
+            "remote": self.remote,
+            "adaptive": self.adaptive,
+            "item_json": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "item_offsets": np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64),
+        }
+        meta = {"vocab": vocab, "stats": self.stats}
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: Dict) -> "TfidfIndex":
+        """Rebuild an index around existing arrays (no copies, no recomputation)"""
+        index = cls.__new__(cls)
+        # Records come back from their encoded JSON; nothing is validated again
+        blob = arrays["item_json"].tobytes()
+        offsets = arrays["item_offsets"].tolist()
+        index.records = [
+            CatalogRecord.from_encoded(blob[start:end], mask)
+            for start, end, mask in zip(offsets, offsets[1:], arrays["category_masks"].tolist())
+        ]
+        vocab = meta["vocab"]
+        shape = (len(index.records), len(vocab))
+        index.word_to_idx = {word: idx for idx, word in enumerate(vocab)}
+        index.idf = dict(zip(vocab, arrays["idf"].tolist()))
+        index.doc_vectors = csr_matrix(
+            (arrays["doc_data"], arrays["doc_indices"], arrays["doc_indptr"]), shape=shape, copy=False
+        )
+        index.postings = csc_matrix(
+            (arrays["post_data"], arrays["post_indices"], arrays["post_indptr"]), shape=shape, copy=False
+        )
+        index.max_weights = arrays["max_weights"]
+        index.min_weights = arrays["min_weights"]
+        index.category_masks = arrays["category_masks"]
+        index.durations = arrays["durations"]
+        index.remote = arrays["remote"]
+        index.adaptive = arrays["adaptive"]
+        index.stats = meta["stats"]
+        return index
+
+    def _build_postings(self):
+        """
+        Inverted index: the CSC form of the document matrix holds, for each
+        term, the posting list of documents containing it and their weights.
+        Per-term weight bounds drive max-score early termination in search().
+        """
+        self.postings = self.doc_vectors.tocsc()
+        self.postings.sort_indices()
+        n_terms = self.postings.shape[1]
+        self.max_weights = np.zeros(n_terms, dtype=np.float64)
+        self.min_weights = np.zeros(n_terms, dtype=np.float64)
+        indptr = self.postings.indptr
+        non_empty = np.flatnonzero(np.diff(indptr) > 0)
+        if len(non_empty):
+            starts = indptr[non_empty]
+            self.max_weights[non_empty] = np.maximum.reduceat(self.postings.data, starts)
+            self.min_weights[non_empty] = np.minimum.reduceat(self.postings.data, starts)
+
+    def query_terms(self, query: str) -> List[tuple]:
+        """Normalized (term index, weight) pairs of the query, in vocabulary order"""
+        # Terms outside the catalog vocabulary cannot match any document
+        weights = sorted(
+            (self.word_to_idx[word], count * self.idf[word])
+            for word, count in Counter(tokenize(query)).items()
+            if word in self.word_to_idx
+        )
+        norm = math.sqrt(sum(w*w for _, w in weights))
+        return [(idx, w / norm if norm > 0 else w) for idx, w in weights]
+
+    def exact_scores(self, doc_ids: np.ndarray, terms: List[tuple]) -> np.ndarray:
+        """
+        Cosine similarity of the query (its query_terms() pairs) against the
+        given documents, from their CSR rows: each stored weight is matched
+        to the sorted query terms, so no vocabulary-sized vector is built.
+        """
+        rows = self.doc_vectors[doc_ids]
+        if not terms or not rows.nnz:
+            return np.zeros(len(doc_ids), dtype=np.float64)
+        term_ids = np.fromiter((t for t, _ in terms), dtype=rows.indices.dtype, count=len(terms))
+        term_weights = np.fromiter((w for _, w in terms), dtype=np.float64, count=len(terms))
+        pos = np.minimum(np.searchsorted(term_ids, rows.indices), len(terms) - 1)
+        contrib = rows.data * np.where(term_ids[pos] == rows.indices, term_weights[pos], 0.0)
+        row_of = np.repeat(np.arange(len(doc_ids)), np.diff(rows.indptr))
+        return np.bincount(row_of, weights=contrib, minlength=len(doc_ids))
+
+    def vectorize_query(self, query: str) -> np.ndarray:
+        """Project the query onto the index vocabulary using the frozen IDF"""
+        vector = np.zeros(len(self.word_to_idx), dtype=np.float64)
+        for idx, w in self.query_terms(query):
+            vector[idx] = w
+        return vector
+
+    def score(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query against every document (one sparse mat-vec)"""
+        return self.doc_vectors @ self.vectorize_query(query)
+
+    def filter_mask(self, filters: Optional[Dict] = None) -> Optional[np.ndarray]:
+        """
+        Boolean mask of documents passing the filters (None = no filter).
+        Keys: max_duration (minutes; unknown durations are kept), remote_support /
+        adaptive_support ("Yes"/"No"), categories (bitmask, any-of).
+        """
+        if not filters:
+            return None
+        allowed = np.ones(len(self), dtype=bool)
+        if filters.get("max_duration") is not None:
+            allowed &= self.durations <= filters["max_duration"]
+        if filters.get("remote_support") is not None:
+            allowed &= self.remote == (filters["remote_support"] == "Yes")
+        if filters.get("adaptive_support") is not None:
+            allowed &= self.adaptive == (filters["adaptive_support"] == "Yes")
+        if filters.get("categories"):
+            allowed &= (self.category_masks & filters["categories"]) != 0
+        return allowed
+
+    def search(self, query: str, k: int = 10, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Top-k document indices, touching only the postings of the query terms.
+        
+        Terms are visited in order of their maximum possible contribution.
+        Once the k-th best partial score beats everything the unvisited terms
+        could still add, no unseen document can reach the top k, so the
+        remaining postings are skipped. Only the admitted candidates are then
+        scored exactly, which keeps the ranking identical to score().
+        
+        `allowed` is an optional boolean mask over documents; postings of
+        other documents are dropped before scoring.
+        """
+        if k <= 0 or not self.records:
+            return np.empty(0, dtype=np.int64)
+        
+        terms = self.query_terms(query)
+        bounds = [max(w * self.max_weights[t], w * self.min_weights[t]) for t, w in terms]
+        order = sorted(range(len(terms)), key=lambda i: bounds[i], reverse=True)
+        # remaining[i] = most the terms after position i in `order` can add
+        remaining = np.cumsum([bounds[i] for i in order][::-1])[::-1].tolist()[1:] + [0.0]
+        
+        cand_ids = np.empty(0, dtype=self.postings.indices.dtype)
+        partial = np.empty(0, dtype=np.float64)
+        indptr = self.postings.indptr
+        for pos, i in enumerate(order):
+            term, w = terms[i]
+            start, end = indptr[term], indptr[term + 1]
+            term_ids = self.postings.indices[start:end]
+            term_vals = self.postings.data[start:end] * w
+            if allowed is not None:
+                keep = allowed[term_ids]
+                term_ids, term_vals = term_ids[keep], term_vals[keep]
+            ids = np.concatenate((cand_ids, term_ids))
+            vals = np.concatenate((partial, term_vals))
+            cand_ids, inverse = np.unique(ids, return_inverse=True)
+            partial = np.bincount(inverse.ravel(), weights=vals)
+            if len(cand_ids) >= k:
+                kth_partial = partial[top_k_indices(partial, k)[-1]]
+                # Small tolerance so float rounding never drops a contender
+                if kth_partial > remaining[pos] * (1 + 1e-9) + 1e-12:
+                    break
+        
+        ranked = np.empty(0, dtype=np.int64)
+        if len(cand_ids):
+            exact = self.exact_scores(cand_ids, terms)
+            hits = exact > 0
+            cand_ids, exact = cand_ids[hits], exact[hits]
+            ranked = cand_ids[top_k_indices(exact, k)].astype(np.int64)
+        if len(ranked) >= k:
+            return ranked
+        
+        # Pad with zero-score documents in catalog order, as a full sort would
+        pool = np.ones(len(self), dtype=bool) if allowed is None else allowed.copy()
+        pool[ranked] = False
+        padding = np.flatnonzero(pool)[:k - len(ranked)]
+        return np.concatenate((ranked, padding.astype(np.int64)))
+
+    def query_matrix(self, queries: List[str]) -> csr_matrix:
+        """Stack the vectorized queries as rows of a sparse matrix"""
+        indptr = [0]
+        indices = []
+        data = []
+        for query in queries:
+            for idx, w in self.query_terms(query):
+                indices.append(idx)
+                data.append(w)
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(queries), len(self.word_to_idx))
+        )
+
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """Scores of every query against every document: one (queries x vocab) @ (vocab x docs) product"""
+        return (self.query_matrix(queries) @ self.doc_vectors.T).toarray()
+
+
+def get_recommendations(query: str, db_instance=None, k: int = 10, filters: Optional[Dict] = None) -> List[Dict]:
+    """
+    Get recommendations using TF-IDF similarity.
+    `filters` optionally narrows the candidates before scoring (see TfidfIndex.filter_mask).
+    """
+    # Fall back to a one-off index when called without the app's cached one
+    index = db_instance if db_instance is not None else build_index()
     
-    # Compute similarities
-    similarities = []
-    for idx, doc_vector in enumerate(doc_vectors):
-        sim = cosine_similarity(query_vector, doc_vector)
-        similarities.append((idx, sim))
+    if not index.records:
+        return []
     
-    # Sort by similarity
-    similarities.sort(key=lambda x: x[1], reverse=True)
+    # Get top k results, scoring only documents that share a query term
+    allowed = index.filter_mask(filters)
+    records = index.records
+    return [records[idx].response for idx in index.search(query, k, allowed)]
+
+
+def get_batch_recommendations(queries: List[str], db_instance=None, k: int = 10,
+                              filters: Optional[Dict] = None) -> List[List[Dict]]:
+    """Get recommendations for many queries at once with a single matrix product"""
+    index = db_instance if db_instance is not None else build_index()
     
-    # Get top k results
-    results = []
-    for idx, score in similarities[:k]:
-        item = catalog[idx]
-        
-        # Convert duration safely (might be int or string)
-        duration_val = item.get("duration", 0)
-        if isinstance(duration_val, int):
-            duration = duration_val
-        elif isinstance(duration_val, str) and duration_val.isdigit():
-            duration = int(duration_val)
-        else:
-            duration = 0
-        
-        # Convert to match AssessmentItem model exactly
-        results.append({
-            "url": item.get("url", ""),
-            "name": item.get("name", ""),
-            "adaptive_support": item.get("adaptive_support", "No"),
-            "description": item.get("description", ""),
-            "duration": duration,
-            "remote_support": item.get("remote_support", "No"),
-            "test_type": item.get("test_type", [])
-        })
+    if not index.records or not queries:
+        return [[] for _ in queries]
     
-    return results
+    scores = index.score_batch(queries)
+    doc_ids = np.arange(len(index))
+    allowed = index.filter_mask(filters)
+    if allowed is not None:
+        doc_ids = doc_ids[allowed]
+        scores = scores[:, allowed]
+    records = index.records
+    return [
+        [records[doc_ids[idx]].response for idx in top_k_indices(row, k)]
+        for row in scores
+    ]
 
 
-# For compatibility with main.py
-def build_index():
-    """Dummy function for compatibility"""
-    return None
+def build_index(catalog: Optional[Iterable[Dict]] = None) -> TfidfIndex:
+    """Build the TF-IDF index once, streaming the catalog from disk if not given"""
+    if catalog is None:
+        catalog = build_simple_index()
+    index = TfidfIndex(catalog)
+    print(f"Index built: {index.stats}")
+    return index
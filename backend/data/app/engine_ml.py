@@ -1,11 +1,30 @@
+import asyncio
+import hashlib
 import json
 import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
 import google.generativeai as genai
 
+try:
+    import fcntl
+except ImportError:  # Windows: builds are then not serialized across processes
+    fcntl = None
+
+from .cache import EmbeddingCache, PersistentCache
+from .catalog import iter_catalog, CATALOG_PATH
+from .taxonomy import load_matcher
+from .utils import (
+    normalize_query, test_type_mask, extract_duration, normalize_yes_no, CATEGORY_BITS,
+    CATEGORY_KNOWLEDGE, CATEGORY_PERSONALITY, CATEGORY_ABILITY, CATEGORY_COGNITIVE, CATEGORY_OTHER,
+)
+
 # Load environment variables
 load_dotenv()
 
@@ -18,45 +37,299 @@ else:
     USE_GEMINI = False
     print("Warning: Gemini API key not configured. Using heuristic balancing.")
 
+# LLM classification: results are memoized per normalized query and calls are
+# bounded by a latency budget (the heuristic answers when the budget expires)
+CLASSIFY_BUDGET_SECONDS = float(os.getenv('LLM_CLASSIFY_BUDGET_MS', 800)) / 1000
+# At most this many distinct queries have an LLM call running or queued;
+# past that, misses are answered by the heuristic without a backfill call
+LLM_MAX_PENDING = int(os.getenv('LLM_MAX_PENDING', 16))
+CLASSIFICATION_CACHE_PATH = os.getenv('CLASSIFICATION_CACHE_PATH', '../data/classification_cache.sqlite3')
+_classification_cache = None
+_classification_cache_lock = threading.Lock()
+_llm_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gemini")
+_llm_in_flight = {}  # normalized query -> future of its running or queued call
+_llm_lock = threading.Lock()
+_model_client = None
+
+def get_classification_cache() -> PersistentCache:
+    """The persistent classification cache, opened on first use (not at import)."""
+    global _classification_cache
+    with _classification_cache_lock:
+        if _classification_cache is None:
+            _classification_cache = PersistentCache(CLASSIFICATION_CACHE_PATH)
+        return _classification_cache
+
+def classification_key(query: str) -> str:
+    """
+    Cache key of a query's classification: lossless normalization (see
+    utils.normalize_query). The prefix keeps entries written under the old
+    lossy clean_text keys from ever being read.
+    """
+    return "q:" + normalize_query(query)
+
+def get_model_client():
+    """The Gemini model client, or None when the API is not configured."""
+    global _model_client
+    if _model_client is None and USE_GEMINI:
+        _model_client = genai.GenerativeModel('gemini-pro')
+    return _model_client
+
+def set_model_client(client):
+    """
+    Swap the model client, e.g. for a local stub when testing offline.
+    Any object with `generate_content(prompt)` returning something with a
+    `.text` attribute works.
+    """
+    global _model_client
+    _model_client = client
+
+PERSIST_DIR = "../data/chroma_db"
+MANIFEST_FILE = os.path.join(PERSIST_DIR, "catalog_manifest.json")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Each rebuild that changes anything writes a new collection "<prefix>_<generation>"
+COLLECTION_PREFIX = "shl_catalog"
+# Bump when build_index changes what it stores per document: a store written
+# with another version is not reused, so every item is embedded again
+METADATA_VERSION = 3
+
+# Changed documents are embedded and upserted in batches of this size while the catalog streams in
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', 64))
+
+def _read_manifest() -> dict:
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _write_manifest(manifest: dict):
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def document_id(item) -> str:
+    """Stable vector-store id for a catalog item (its URL, hashed)."""
+    return hashlib.sha1(item['url'].encode('utf-8')).hexdigest()
+
+def document_fingerprint(content: str, metadata: dict) -> str:
+    """Hash of everything stored for one item: embedded text plus returned metadata."""
+    payload = content + "\x00" + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# Query embeddings, keyed by normalized query text; optionally spilled to disk
+query_embedding_cache = EmbeddingCache(
+    max_bytes=int(float(os.getenv('QUERY_EMBEDDING_CACHE_MB', 16)) * 1024 * 1024),
+    spill_path=os.getenv('QUERY_EMBEDDING_SPILL') or None,
+)
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps the sentence-transformer so repeated (or trivially different)
+    queries skip the model forward pass. Document embedding is unchanged.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache):
+        self.base = base
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        # Only case and spacing are normalized: the model is uncased
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put(key, vector)
+            return vector
+        return vector.tolist()
+
+def filter_metadata(item) -> dict:
+    """
+    Normalized per-document fields stored next to the vectors: the category
+    bitmask for result balancing, plus scalar columns the vector store can
+    filter on before similarity search (it has no bitwise operators, hence
+    one boolean flag per category).
+    """
+    mask = test_type_mask(item['test_type'])
+    fields = {
+        'category_mask': mask,
+        'duration_minutes': extract_duration(item.get('duration', 0)),
+        'remote': normalize_yes_no(item.get('remote_support', 'No')),
+        'adaptive': normalize_yes_no(item.get('adaptive_support', 'No')),
+    }
+    for name, bit in CATEGORY_BITS.items():
+        fields[f'cat_{name}'] = bool(mask & bit)
+    return fields
+
+def build_where(filters):
+    """Translate request filters into a Chroma `where` clause (None = no filter)."""
+    if not filters:
+        return None
+    clauses = []
+    if filters.get('max_duration') is not None:
+        clauses.append({'duration_minutes': {'$lte': filters['max_duration']}})
+    if filters.get('remote_support') is not None:
+        clauses.append({'remote': filters['remote_support']})
+    if filters.get('adaptive_support') is not None:
+        clauses.append({'adaptive': filters['adaptive_support']})
+    if filters.get('categories'):
+        flags = [{f'cat_{name}': True} for name, bit in CATEGORY_BITS.items() if filters['categories'] & bit]
+        clauses.append(flags[0] if len(flags) == 1 else {'$or': flags})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+_embeddings = None
+
+def get_embeddings() -> Embeddings:
+    """The sentence-transformer (behind the query cache), loaded once per process."""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CachedQueryEmbeddings(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), query_embedding_cache)
+    return _embeddings
+
+def _open_collection(name: str, embeddings: Embeddings):
+    return Chroma(collection_name=name, persist_directory=PERSIST_DIR, embedding_function=embeddings)
+
+def _copy_vectors(source, target, ids):
+    """Copy stored vectors, texts and metadata between collections without re-embedding."""
+    stored = source._collection.get(ids=ids, include=['embeddings', 'documents', 'metadatas'])
+    target._collection.upsert(ids=stored['ids'], embeddings=stored['embeddings'],
+                              documents=stored['documents'], metadatas=stored['metadatas'])
+
+def _drop_collections(db, keep):
+    """Delete collections left by older builds (everything not in `keep`)."""
+    for collection in db._client.list_collections():
+        name = getattr(collection, 'name', collection)
+        if name not in keep:
+            db._client.delete_collection(name)
+
+@contextmanager
+def _build_lock():
+    """
+    Exclusive lock on `<PERSIST_DIR>.lock` for the duration of a build, so
+    processes sharing the vector DB (e.g. app.serve workers reloading the
+    same catalog change) never build into or drop collections concurrently.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{PERSIST_DIR}.lock", 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 # 1. Initialize Vector DB
-def build_index():
-    """Build or load the vector database from scraped SHL catalog."""
-    with open('../data/shl_catalog.json', 'r') as f:
-        data = json.load(f)
+def build_index(catalog=None):
+    """
+    Build or load the vector database from scraped SHL catalog.
+    
+    The persisted collection is reused when it was built with the same
+    embedding model and METADATA_VERSION. Each item carries a content fingerprint in the manifest,
+    so only added or changed items are embedded; an unchanged catalog embeds
+    nothing and returns the current collection.
+    
+    The collection a running server searches is never modified: any change
+    is built into a new collection (unchanged vectors are copied over, removed
+    items are left out) and published by rewriting the manifest, so the
+    caller swaps in a complete index. Collections older than the one being
+    replaced are deleted.
+    
+    `catalog` may be a stream (catalog.iter_catalog): items are fingerprinted
+    as they arrive and changed ones are embedded in batches of
+    EMBED_BATCH_SIZE, so unchanged items are never held as Documents.
+    
+    Builds hold a lock file (see _build_lock): a process that waited for
+    another one's build then finds the manifest up to date and reuses the
+    collection it produced.
+    """
+    if catalog is None:
+        catalog = iter_catalog(CATALOG_PATH)
+    with _build_lock():
+        return _build_index(catalog)
+
+def _build_index(catalog):
+    embeddings = get_embeddings()
+    manifest = _read_manifest()
+    reusable = (manifest.get('embedding_model') == EMBEDDING_MODEL
+                and manifest.get('metadata_version') == METADATA_VERSION
+                and os.path.isdir(PERSIST_DIR))
+    generation = manifest.get('generation', 0)
+    # Stores written before collections were versioned used langchain's default name
+    current_name = manifest.get('collection', 'langchain')
+    current = _open_collection(current_name, embeddings) if reusable else None
+    # Unknown contents (no manifest, another model or metadata layout): everything is embedded
+    previous = manifest.get('documents', {}) if reusable else {}
     
-    documents = []
-    for item in data:
+    new_name = f"{COLLECTION_PREFIX}_{generation + 1}"
+    db = None  # the new collection, created on the first change
+    
+    def new_collection():
+        nonlocal db
+        if db is None:
+            # Left over from an interrupted build: start it empty
+            _open_collection(new_name, embeddings).delete_collection()
+            db = _open_collection(new_name, embeddings)
+        return db
+    
+    fingerprints = {}
+    batch, batch_ids = [], []
+    unchanged = []  # ids still to be copied into the new collection
+    embedded = 0
+    for item in catalog:
+        doc_id = document_id(item)
+        if doc_id in fingerprints:
+            continue
         # Embed the description and name for semantic search
         # Include test_type for better matching
         content = f"{item['name']} {item['description']} Test Types: {', '.join(item['test_type'])}"
-        documents.append(Document(page_content=content, metadata=item))
+        metadata = {**item, **filter_metadata(item)}
+        fingerprints[doc_id] = document_fingerprint(content, metadata)
+        if previous.get(doc_id) == fingerprints[doc_id]:
+            unchanged.append(doc_id)
+            if db is not None and len(unchanged) >= EMBED_BATCH_SIZE:
+                _copy_vectors(current, db, unchanged)
+                unchanged = []
+            continue
+        batch.append(Document(page_content=content, metadata=metadata))
+        batch_ids.append(doc_id)
+        if len(batch) >= EMBED_BATCH_SIZE:
+            new_collection().add_documents(batch, ids=batch_ids)
+            embedded += len(batch)
+            batch, batch_ids = [], []
+    
+    removed = [doc_id for doc_id in previous if doc_id not in fingerprints]
+    if current is not None and db is None and not batch and not removed:
+        print("Catalog unchanged. Loaded persisted vector DB.")
+        return current
     
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    if batch:
+        new_collection().add_documents(batch, ids=batch_ids)
+        embedded += len(batch)
+    for i in range(0, len(unchanged), EMBED_BATCH_SIZE):
+        _copy_vectors(current, new_collection(), unchanged[i:i + EMBED_BATCH_SIZE])
+    db = new_collection()
+    print(f"Vector DB delta: {embedded} embedded, {len(removed)} deleted, "
+          f"{len(fingerprints) - embedded} unchanged -> collection {new_name}")
     
-    # Persist DB
-    db = Chroma.from_documents(documents, embeddings, persist_directory="../data/chroma_db")
+    _write_manifest({
+        'embedding_model': EMBEDDING_MODEL,
+        'metadata_version': METADATA_VERSION,
+        'collection': new_name,
+        'generation': generation + 1,
+        'num_documents': len(fingerprints),
+        'documents': fingerprints,
+    })
+    # The replaced collection stays until the next build: requests that
+    # started before the swap may still be searching it
+    _drop_collections(db, keep={new_name, current_name} if reusable else {new_name})
     return db
 
-def classify_query_with_gemini(query: str) -> dict:
-    """
-    Use Gemini API to intelligently classify the query needs.
-    
-    Returns:
-        {
-            'needs_technical': bool,
-            'needs_behavioral': bool,
-            'needs_cognitive': bool,
-            'skill_ratio': float (0.0-1.0, higher means more technical)
-        }
-    """
-    if not USE_GEMINI:
-        # Fallback to heuristic classification
-        return classify_query_heuristic(query)
-    
-    try:
-        model = genai.GenerativeModel('gemini-pro')
-        
-        prompt = f"""Analyze this job requirement query and classify what types of assessments are needed:
+def _classification_prompt(query: str) -> str:
+    return f"""Analyze this job requirement query and classify what types of assessments are needed:
 
 Query: "{query}"
 
@@ -77,35 +350,115 @@ Examples:
 
 Only return the JSON, nothing else."""
 
-        response = model.generate_content(prompt)
-        result = json.loads(response.text.strip())
-        return result
-        
-    except Exception as e:
-        print(f"Gemini API error: {e}. Falling back to heuristics.")
-        return classify_query_heuristic(query)
+def _call_gemini(query: str, client) -> dict:
+    """Blocking LLM call; raises on network or parse errors."""
+    response = client.generate_content(_classification_prompt(query))
+    result = json.loads(response.text.strip())
+    return {
+        'needs_technical': bool(result['needs_technical']),
+        'needs_behavioral': bool(result['needs_behavioral']),
+        'needs_cognitive': bool(result['needs_cognitive']),
+        'skill_ratio': float(result['skill_ratio']),
+    }
 
-def classify_query_heuristic(query: str) -> dict:
+def _submit_classification(query: str, key: str, client):
     """
-    Heuristic-based query classification as fallback.
+    Start the LLM call in the background; its result backfills the cache
+    whenever it lands. Requests for a query already being classified share
+    its call. Returns None when LLM_MAX_PENDING calls are already pending.
     """
-    query_lower = query.lower()
+    with _llm_lock:
+        future = _llm_in_flight.get(key)
+        if future is not None:
+            return future
+        if len(_llm_in_flight) >= LLM_MAX_PENDING:
+            return None
+        future = _llm_executor.submit(_call_gemini, query, client)
+        _llm_in_flight[key] = future
+    
+    def backfill(done):
+        try:
+            if done.cancelled():
+                return
+            error = done.exception()
+            if error is not None:
+                print(f"Gemini API error: {error}. Falling back to heuristics.")
+                return
+            get_classification_cache().put(key, done.result())
+        finally:
+            # Only after the cache write, so no request misses both
+            with _llm_lock:
+                _llm_in_flight.pop(key, None)
     
-    # Technical indicators
-    technical_keywords = ['java', 'python', 'sql', 'javascript', 'developer', 'programmer', 
-                         'coding', 'technical', 'engineering', 'data', 'analyst', 'software']
+    future.add_done_callback(backfill)
+    return future
+
+def classify_query(query: str, budget: float = None) -> dict:
+    """
+    Cached, latency-bounded classification for the request path.
+    
+    A cached result is returned immediately. Otherwise the LLM gets `budget`
+    seconds; if it is slower (or fails) the heuristic answers this request
+    and the LLM result still lands in the cache for the next one.
+    """
+    key = classification_key(query)
+    cached = get_classification_cache().get(key)
+    if cached is not None:
+        return cached
+    client = get_model_client()
+    if client is None:
+        return classify_query_heuristic(query)
     
-    # Behavioral indicators
-    behavioral_keywords = ['collaborate', 'leadership', 'communication', 'team', 'personality',
-                          'behavioral', 'soft skill', 'interpersonal', 'stakeholder', 'management']
+    future = _submit_classification(query, key, client)
+    if future is None:
+        print("Gemini backlog full. Using heuristics for this request.")
+        return classify_query_heuristic(query)
+    try:
+        return future.result(timeout=CLASSIFY_BUDGET_SECONDS if budget is None else budget)
+    except FutureTimeoutError:
+        print("Gemini classification over budget. Using heuristics for this request.")
+    except Exception:
+        pass
+    return classify_query_heuristic(query)
+
+async def classify_query_async(query: str, budget: float = None) -> dict:
+    """Same as classify_query(), but awaits the LLM without blocking the event loop."""
+    key = classification_key(query)
+    cached = get_classification_cache().get(key)
+    if cached is not None:
+        return cached
+    client = get_model_client()
+    if client is None:
+        return classify_query_heuristic(query)
     
-    # Cognitive indicators
-    cognitive_keywords = ['problem-solving', 'analytical', 'cognitive', 'reasoning', 'aptitude',
-                         'critical thinking', 'logical']
+    future = _submit_classification(query, key, client)
+    if future is None:
+        print("Gemini backlog full. Using heuristics for this request.")
+        return classify_query_heuristic(query)
+    try:
+        # shield() so the timeout doesn't cancel the call that backfills the cache
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                      timeout=CLASSIFY_BUDGET_SECONDS if budget is None else budget)
+    except asyncio.TimeoutError:
+        print("Gemini classification over budget. Using heuristics for this request.")
+    except Exception:
+        pass
+    return classify_query_heuristic(query)
+
+# Keyword taxonomy compiled once at import
+QUERY_MATCHER = load_matcher()
+
+def classify_query_heuristic(query: str) -> dict:
+    """
+    Heuristic-based query classification as fallback.
+    """
+    # Technical / behavioral / cognitive indicators (see query_keywords.json),
+    # all found in a single pass over the query
+    matches = QUERY_MATCHER.match(query)
     
-    needs_technical = any(kw in query_lower for kw in technical_keywords)
-    needs_behavioral = any(kw in query_lower for kw in behavioral_keywords)
-    needs_cognitive = any(kw in query_lower for kw in cognitive_keywords) or needs_technical
+    needs_technical = 'technical' in matches
+    needs_behavioral = 'behavioral' in matches
+    needs_cognitive = 'cognitive' in matches or needs_technical
     
     # Calculate ratio
     if needs_technical and needs_behavioral:
@@ -125,18 +478,23 @@ def classify_query_heuristic(query: str) -> dict:
     }
 
 # 2. Retrieval Logic with Intelligent Balancing
-def get_recommendations(query, db, max_results=10):
+def get_recommendations(query, db, max_results=10, filters=None, classification=None):
     """
     Get balanced recommendations based on query analysis.
     
     CRITICAL: This implements the "Recommendation Balance" requirement from the assignment.
     If a query mentions both technical and behavioral skills, results MUST include both types.
+    
+    `filters` (max_duration, remote_support, adaptive_support, categories) are
+    pushed into the vector store so only matching documents are searched.
+    A precomputed `classification` (e.g. from classify_query_async) skips step 1.
     """
     # Step 1: Classify the query
-    classification = classify_query_with_gemini(query)
+    if classification is None:
+        classification = classify_query(query)
     
     # Step 2: Perform Similarity Search (get more than needed for filtering)
-    results = db.similarity_search(query, k=30)
+    results = db.similarity_search(query, k=30, filter=build_where(filters))
     
     # Step 3: Categorize results by test type
     categorized = {
@@ -147,30 +505,22 @@ def get_recommendations(query, db, max_results=10):
         'other': []
     }
     
+    # Category bitmasks are precomputed at index-build time (see build_index)
+    bucket_bits = [
+        ('knowledge_skills', CATEGORY_KNOWLEDGE),
+        ('personality_behavior', CATEGORY_PERSONALITY),
+        ('ability_aptitude', CATEGORY_ABILITY),
+        ('cognitive', CATEGORY_COGNITIVE),
+        ('other', CATEGORY_OTHER),
+    ]
     for doc in results:
-        test_types = doc.metadata.get('test_type', [])
-        test_types_str = ' '.join(test_types).lower()
-        
-        categorized_flag = False
-        
-        if 'knowledge' in test_types_str or 'skills' in test_types_str:
-            categorized['knowledge_skills'].append(doc)
-            categorized_flag = True
-        
-        if 'personality' in test_types_str or 'behavior' in test_types_str:
-            categorized['personality_behavior'].append(doc)
-            categorized_flag = True
-        
-        if 'ability' in test_types_str or 'aptitude' in test_types_str:
-            categorized['ability_aptitude'].append(doc)
-            categorized_flag = True
-        
-        if 'cognitive' in test_types_str or 'reasoning' in test_types_str:
-            categorized['cognitive'].append(doc)
-            categorized_flag = True
-        
-        if not categorized_flag:
-            categorized['other'].append(doc)
+        mask = doc.metadata.get('category_mask')
+        if mask is None:
+            # Vector store built before masks existed
+            mask = test_type_mask(doc.metadata.get('test_type', []))
+        for bucket, bit in bucket_bits:
+            if mask & bit:
+                categorized[bucket].append(doc)
     
     # Step 4: Balance the recommendations based on classification
     final_recs = []
@@ -245,4 +595,11 @@ def get_recommendations(query, db, max_results=10):
             "test_type": meta['test_type']
         })
     
-    return response_data
\ No newline at end of file
+    return response_data
+
+def get_batch_recommendations(queries, db, max_results=10, filters=None):
+    """
+    Recommendations for several queries (same order as given).
+    Each query needs its own classification and balancing pass.
+    """
+    return [get_recommendations(query, db, max_results, filters=filters) for query in queries]
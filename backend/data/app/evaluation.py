@@ -1,8 +1,16 @@
+import hashlib
 import json
+import os
 import numpy as np
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Sequence
 from .load_datasets import load_excel_dataset, parse_train_set
-from .engine import get_recommendations, build_index
+from .engine import get_batch_recommendations, build_index
+
+DEFAULT_KS = (1, 3, 5, 10)
+CHECKPOINT_FILE = "../data/evaluation_checkpoint.ndjson"
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", os.cpu_count() or 1))
+EVAL_CHUNK_SIZE = int(os.getenv("EVAL_CHUNK_SIZE", 32))
 
 def calculate_recall_at_k(predicted_urls: List[str], relevant_urls: List[str], k: int = 10) -> float:
     """
@@ -32,106 +40,234 @@ def calculate_recall_at_k(predicted_urls: List[str], relevant_urls: List[str], k
     
     return recall
 
+def index_labels(labeled_data: List[Dict]) -> Dict[str, set]:
+    """
+    Hash index of the labels: stripped query -> set of relevant URLs.
+    The train set lists one relevant assessment per row, so rows sharing a
+    query are merged.
+    """
+    labels = {}
+    for labeled in labeled_data:
+        labels.setdefault(labeled['query'].strip(), set()).update(labeled['relevant_assessments'])
+    return labels
+
+def relevance_matrix(predictions: List[Dict], labels: Dict[str, set], max_k: int) -> tuple:
+    """
+    (rel, n_relevant) for the predictions that have labels: rel[i, r] is 1
+    when query i's prediction at rank r is relevant (rows padded with 0).
+    """
+    rows = []
+    n_relevant = []
+    for pred in predictions:
+        relevant = labels.get(pred['query'].strip())
+        if not relevant:
+            continue
+        row = np.zeros(max_k)
+        for rank, url in enumerate(pred['predicted_urls'][:max_k]):
+            row[rank] = url in relevant
+        rows.append(row)
+        n_relevant.append(len(relevant))
+    if not rows:
+        return np.zeros((0, max_k)), np.zeros(0)
+    return np.vstack(rows), np.array(n_relevant, dtype=float)
+
+def ranking_metrics(predictions: List[Dict], labels: Dict[str, set], ks: Sequence[int] = DEFAULT_KS) -> Dict[str, float]:
+    """
+    Mean Recall@k, MAP@k and nDCG@k for every k in one pass over a
+    (queries x max k) relevance matrix.
+    """
+    max_k = max(ks)
+    rel, n_relevant = relevance_matrix(predictions, labels, max_k)
+    metrics = {}
+    if len(rel) == 0:
+        for k in ks:
+            metrics.update({f'recall@{k}': 0.0, f'map@{k}': 0.0, f'ndcg@{k}': 0.0})
+        return metrics
+
+    ranks = np.arange(1, max_k + 1)
+    hits = np.cumsum(rel, axis=1)                       # relevant items in the top r
+    precision_gain = np.cumsum(rel * hits / ranks, axis=1)  # sum of precision@r at relevant ranks
+    discounts = 1.0 / np.log2(ranks + 1)
+    dcg = np.cumsum(rel * discounts, axis=1)
+    ideal_dcg = np.cumsum(discounts)
+
+    for k in ks:
+        cut = min(k, max_k) - 1
+        metrics[f'recall@{k}'] = float(np.mean(hits[:, cut] / n_relevant))
+        metrics[f'map@{k}'] = float(np.mean(precision_gain[:, cut] / np.minimum(k, n_relevant)))
+        # Ideal ranking puts min(k, |relevant|) relevant items first
+        ideal = ideal_dcg[np.minimum(k, n_relevant).astype(int) - 1]
+        metrics[f'ndcg@{k}'] = float(np.mean(dcg[:, cut] / ideal))
+    return metrics
+
 def mean_recall_at_k(predictions: List[Dict], labeled_data: List[Dict], k: int = 10) -> float:
     """
     Calculate Mean Recall@K across all queries.
-    
+
     Args:
         predictions: List of {query, predicted_urls} dicts
         labeled_data: List of {query, relevant_assessments} dicts from training data
         k: Number of top predictions to consider
-        
+
     Returns:
         Mean Recall@K score
     """
-    recall_scores = []
-    
-    for pred in predictions:
-        query = pred['query']
-        predicted_urls = pred['predicted_urls']
-        
-        # Find corresponding labeled data
-        relevant_urls = None
-        for labeled in labeled_data:
-            if labeled['query'].strip() == query.strip():
-                relevant_urls = labeled['relevant_assessments']
-                break
-        
-        if relevant_urls:
-            recall = calculate_recall_at_k(predicted_urls, relevant_urls, k)
-            recall_scores.append(recall)
-            print(f"Query: {query[:50]}... | Recall@{k}: {recall:.3f}")
-    
-    if not recall_scores:
-        return 0.0
-    
-    mean_recall = np.mean(recall_scores)
-    return mean_recall
+    return ranking_metrics(predictions, index_labels(labeled_data), ks=[k])[f'recall@{k}']
+
+def _load_checkpoint(path: str, meta: Dict) -> Dict[str, List[str]]:
+    """Predictions already made by an interrupted run with the same settings"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    if not lines or json.loads(lines[0]) != meta:
+        print(f"Checkpoint {path} is from a different run; starting over")
+        return done
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            break  # torn last line from an interrupted write
+        done[record['query']] = record['predicted_urls']
+    return done
+
+_worker_index = None
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+def _predict_chunk(queries: List[str], k: int) -> List[List[str]]:
+    batch = get_batch_recommendations(queries, _worker_index, k=k)
+    return [[r['url'] for r in results] for results in batch]
+
+def predict_all(queries: List[str], db_instance, k: int, workers: int = EVAL_WORKERS,
+                checkpoint: str = CHECKPOINT_FILE, checkpoint_meta: Dict = None) -> Dict[str, List[str]]:
+    """
+    Top-k URLs for every query, fanned out over a process pool in chunks.
+    Each finished chunk is appended to `checkpoint` (NDJSON, first line the
+    run settings), so an interrupted run resumes with the remaining queries.
+    """
+    meta = dict(checkpoint_meta or {}, k=k)
+    done = _load_checkpoint(checkpoint, meta) if checkpoint else {}
+    todo = [q for q in dict.fromkeys(queries) if q not in done]
+    if done:
+        print(f"Resuming: {len(done)} queries from checkpoint, {len(todo)} to go")
+    if not todo:
+        return done
+
+    chunks = [todo[i:i + EVAL_CHUNK_SIZE] for i in range(0, len(todo), EVAL_CHUNK_SIZE)]
+    out = None
+    if checkpoint:
+        # Rewrite what is kept (drops a torn last line), then append as chunks finish
+        out = open(checkpoint, 'w', encoding='utf-8')
+        out.write(json.dumps(meta) + "\n")
+        for query, predicted in done.items():
+            out.write(json.dumps({'query': query, 'predicted_urls': predicted}) + "\n")
+    try:
+        if workers > 1 and len(chunks) > 1:
+            # Workers get the built index once, at start-up
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker,
+                                     initargs=(db_instance,)) as pool:
+                results = pool.map(_predict_chunk, chunks, [k] * len(chunks))
+                _record_chunks(chunks, results, done, out)
+        else:
+            _init_worker(db_instance)
+            _record_chunks(chunks, (_predict_chunk(chunk, k) for chunk in chunks), done, out)
+    finally:
+        if out is not None:
+            out.close()
+    return done
 
-def evaluate_on_train_set(db_instance, dataset_path: str = "../data/Gen_AI Dataset.xlsx"):
+def _record_chunks(chunks, results, done: Dict, out):
+    for chunk, urls in zip(chunks, results):
+        for query, predicted in zip(chunk, urls):
+            done[query] = predicted
+            if out is not None:
+                out.write(json.dumps({'query': query, 'predicted_urls': predicted}) + "\n")
+        if out is not None:
+            out.flush()
+
+def evaluate_on_train_set(db_instance, dataset_path: str = "../data/Gen_AI Dataset.xlsx",
+                          ks: Sequence[int] = DEFAULT_KS, workers: int = EVAL_WORKERS,
+                          checkpoint: str = CHECKPOINT_FILE):
     """
     Evaluate the recommendation system on the labeled train set.
-    
+
     Returns evaluation metrics for the approach document.
     """
     print("="*60)
     print("EVALUATION ON LABELED TRAIN SET")
     print("="*60)
-    
+
     # Load datasets
     datasets = load_excel_dataset(dataset_path)
-    
+
     if 'train' not in datasets:
         print("Error: Train set not found in dataset")
         return None
-    
+
     # Parse labeled data
     labeled_data = parse_train_set(datasets['train'])
-    print(f"\nEvaluating on {len(labeled_data)} labeled queries...\n")
-    
-    # Generate predictions
-    predictions = []
-    for item in labeled_data:
-        query = item['query']
-        results = get_recommendations(query, db_instance)
-        predicted_urls = [r['url'] for r in results]
-        
-        predictions.append({
-            'query': query,
-            'predicted_urls': predicted_urls
-        })
-    
+    labels = index_labels(labeled_data)
+    print(f"\nEvaluating on {len(labels)} labeled queries ({len(labeled_data)} rows)...\n")
+
+    # Generate predictions for every distinct query
+    queries = list(labels)
+    # A checkpoint is only resumed against the same catalog
+    catalog = getattr(db_instance, 'catalog', None)
+    checkpoint_meta = {'catalog_sha1': hashlib.sha1(json.dumps(catalog, sort_keys=True).encode('utf-8')).hexdigest()}
+    predicted = predict_all(queries, db_instance, max(ks), workers, checkpoint, checkpoint_meta)
+    predictions = [{'query': query, 'predicted_urls': predicted[query]} for query in queries]
+
     # Calculate metrics
-    recall_5 = mean_recall_at_k(predictions, labeled_data, k=5)
-    recall_10 = mean_recall_at_k(predictions, labeled_data, k=10)
-    
+    metrics = ranking_metrics(predictions, labels, ks)
+    for pred in predictions:
+        recall = calculate_recall_at_k(pred['predicted_urls'], labels[pred['query'].strip()], max(ks))
+        print(f"Query: {pred['query'][:50]}... | Recall@{max(ks)}: {recall:.3f}")
+
     print("\n" + "="*60)
     print("EVALUATION RESULTS")
     print("="*60)
-    print(f"Mean Recall@5:  {recall_5:.4f}")
-    print(f"Mean Recall@10: {recall_10:.4f}")
+    for k in ks:
+        print(f"@{k:<3} Recall: {metrics[f'recall@{k}']:.4f}  MAP: {metrics[f'map@{k}']:.4f}  "
+              f"nDCG: {metrics[f'ndcg@{k}']:.4f}")
     print("="*60)
-    
+
     # Save results
     results = {
-        'mean_recall_at_5': float(recall_5),
-        'mean_recall_at_10': float(recall_10),
-        'num_queries': len(labeled_data),
+        'metrics': metrics,
+        'num_queries': len(labels),
         'predictions': predictions
     }
-    
+    for k in ks:
+        results[f'mean_recall_at_{k}'] = metrics[f'recall@{k}']
+
     output_file = "../data/evaluation_results.json"
     with open(output_file, 'w') as f:
         json.dump(results, f, indent=2)
-    
+
     print(f"\nResults saved to {output_file}")
-    
+    if checkpoint and os.path.exists(checkpoint):
+        # Finished: the next run starts from scratch
+        os.remove(checkpoint)
+
     return results
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Evaluate recommendations on the labeled train set")
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_KS), help="cut-offs to report")
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS)
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint from an interrupted run")
+    args = parser.parse_args()
+    if args.fresh and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
     # Build index and evaluate
     print("Building search index...")
     db = build_index()
-    
+
     print("\nStarting evaluation...")
-    results = evaluate_on_train_set(db)
+    results = evaluate_on_train_set(db, ks=args.k, workers=args.workers)
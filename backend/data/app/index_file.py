@@ -0,0 +1,146 @@
+"""
+Compiled on-disk TF-IDF index.
+
+    python -m app.index_file            # build ../data/shl_index.bin from the catalog
+
+The file holds everything the engine needs (document vectors, postings, IDF,
+filter columns, vocabulary and each record's encoded response JSON) so
+startup memory-maps it instead of parsing the catalog and recomputing TF-IDF.
+The arrays are read-only views over the mapping; the OS page cache shares
+them between every process that opens the same file.
+
+Layout (also used for the shared memory block in shared_index.py):
+8-byte little-endian header length, JSON header (array offsets, dtypes,
+shapes + index metadata), then the 64-byte aligned arrays.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+from .engine import TfidfIndex, build_index
+from .catalog import iter_catalog, CATALOG_PATH
+
+INDEX_FILE_PATH = os.getenv("COMPILED_INDEX_PATH", "../data/shl_index.bin")
+FORMAT_VERSION = 3
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def pack_index(index: TfidfIndex, extra_meta: Optional[Dict] = None) -> tuple:
+    """
+    Lay the index out for a flat buffer.
+    Returns (header bytes, arrays, array offsets relative to the data start, total size).
+    """
+    arrays, meta = index.to_arrays()
+    meta["format_version"] = FORMAT_VERSION
+    meta.update(extra_meta or {})
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        layout[name] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+        offset = _aligned(offset + arr.nbytes)
+    header = json.dumps({"arrays": layout, "meta": meta}).encode("utf-8")
+    return header, arrays, layout, _aligned(8 + len(header)) + offset
+
+
+def write_packed(buf, header: bytes, arrays: Dict[str, np.ndarray], layout: Dict):
+    """Copy a packed index into a writable buffer of at least the packed size"""
+    data_start = _aligned(8 + len(header))
+    buf[:8] = struct.pack("<Q", len(header))
+    buf[8:8 + len(header)] = header
+    for name, arr in arrays.items():
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=buf, offset=data_start + layout[name]["offset"])
+        view[...] = arr
+
+
+def read_header(buf) -> Dict:
+    (header_len,) = struct.unpack("<Q", bytes(buf[:8]))
+    return json.loads(bytes(buf[8:8 + header_len]).decode("utf-8"))
+
+
+def index_from_buffer(buf, header: Optional[Dict] = None) -> TfidfIndex:
+    """Wrap read-only zero-copy views around a packed index"""
+    (header_len,) = struct.unpack("<Q", bytes(buf[:8]))
+    if header is None:
+        header = read_header(buf)
+    data_start = _aligned(8 + header_len)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+                          buffer=buf, offset=data_start + spec["offset"])
+        view.flags.writeable = False
+        arrays[name] = view
+    return TfidfIndex.from_arrays(arrays, header["meta"])
+
+
+def file_digest(path: str) -> str:
+    """SHA-1 of a file's bytes, used to tie a compiled index to its catalog"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_index_file(index: TfidfIndex, path: str = INDEX_FILE_PATH, catalog_sha1: Optional[str] = None):
+    """Write the compiled index atomically (temp file + rename)"""
+    header, arrays, layout, size = pack_index(index, {"catalog_sha1": catalog_sha1})
+    buf = bytearray(size)
+    write_packed(buf, header, arrays, layout)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(buf)
+    # Processes that still map the old file keep reading it until they reopen
+    os.replace(tmp_path, path)
+
+
+def open_index_file(path: str = INDEX_FILE_PATH, catalog_path: Optional[str] = None) -> Optional[TfidfIndex]:
+    """
+    Memory-map a compiled index. Returns None when the file is missing, from
+    another format version, or (if `catalog_path` is given) built from a
+    different catalog than the one on disk.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = read_header(mapped)
+    meta = header["meta"]
+    if meta.get("format_version") != FORMAT_VERSION:
+        print(f"Compiled index {path} has format {meta.get('format_version')}, expected {FORMAT_VERSION}")
+        mapped.close()
+        return None
+    if catalog_path is not None and meta.get("catalog_sha1") != file_digest(catalog_path):
+        print(f"Compiled index {path} is stale for {catalog_path}")
+        mapped.close()
+        return None
+    index = index_from_buffer(mapped, header)
+    # The views borrow the mapping; keep it open as long as the index lives
+    index.mapped_file = mapped
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the catalog into a memory-mappable index file")
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    parser.add_argument("--output", default=INDEX_FILE_PATH)
+    args = parser.parse_args()
+
+    index = build_index(iter_catalog(args.catalog))
+    write_index_file(index, args.output, catalog_sha1=file_digest(args.catalog))
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,28 @@
 import uvicorn
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import local modules
-from .models import QueryRequest, RecommendationResponse
-from .engine import get_recommendations, build_index
+from .models import QueryRequest, RecommendationResponse, BatchQueryRequest, BatchRecommendationResponse
+from .catalog import CatalogManager, CATALOG_PATH, encode_items, migrate_legacy_catalog
+from .cache import QueryCache, cached_recommendations_async, cached_batch_recommendations
 from .scraper import run_scraper
 
+# Select the recommendation engine (TF-IDF by default, "ml" for the vector DB + Gemini engine)
+if os.getenv("RECOMMENDER_ENGINE", "tfidf").lower() == "ml":
+    from . import engine_ml as engine
+else:
+    from . import engine
+get_recommendations = engine.get_recommendations
+get_batch_recommendations = engine.get_batch_recommendations
+build_index = engine.build_index
+
 app = FastAPI(title="SHL Assessment Recommender API")
 
 # Enable CORS for Frontend
@@ -19,25 +34,154 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global DB instance
-db_instance = None
+# Owns the live index: built once at startup, rebuilt in the background
+# whenever the catalog file changes
+catalog_manager = CatalogManager(
+    build_fn=build_index,
+    path=CATALOG_PATH,
+    poll_interval=float(os.getenv("CATALOG_POLL_SECONDS", 5)),
+)
+
+# Results for repeated queries, dropped automatically when the catalog version changes
+result_cache = QueryCache(
+    max_size=int(os.getenv("RESULT_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", 300)),
+)
+
+# CPU-bound scoring/embedding runs on its own pool so it never competes with
+# FastAPI's default threadpool or blocks the event loop. Its threads only run
+# in parallel inside code that releases the GIL (NumPy/SciPy kernels, model
+# inference); the Python parts of scoring use one core per process. To use
+# more cores, run several worker processes with app.serve.
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", os.cpu_count() or 1))
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+
+class RequestLimiter:
+    """
+    Backpressure: at most `limit` queries are admitted (running or queued for
+    the scoring pool); past that, requests get an immediate 503. A batch
+    counts as one query per entry, capped at `limit` so the largest batch is
+    still admitted when nothing else is running.
+
+    A request keeps its slots until its scoring jobs (see track) finish, even
+    if the request itself is cancelled first (e.g. the client disconnects),
+    so the limit always bounds the work actually running or queued.
+    The counter is only changed on the event loop, so no lock is needed.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        # Scoring jobs of the request being handled in the current context
+        self._jobs = ContextVar("scoring_jobs", default=None)
+
+    @contextmanager
+    def admit(self, queries: int = 1):
+        weight = max(1, min(queries, self.limit))
+        if self.in_flight + weight > self.limit:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry",
+                                headers={"Retry-After": "1"})
+        self.in_flight += weight
+        jobs = []
+        token = self._jobs.set(jobs)
+        try:
+            yield
+        finally:
+            self._jobs.reset(token)
+            self._release_after(weight, [job for job in jobs if not job.done()])
+
+    def track(self, job):
+        """Hold the current request's slots until `job` (a concurrent Future) is done"""
+        jobs = self._jobs.get()
+        if jobs is not None:
+            jobs.append(job)
+
+    def _release(self, weight: int):
+        self.in_flight -= weight
+
+    def _release_after(self, weight: int, running):
+        if not running:
+            self._release(weight)
+            return
+        loop = asyncio.get_running_loop()
+        remaining = [len(running)]
+
+        def one_done():
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self._release(weight)
+        for job in running:
+            # Done callbacks run on the scoring thread; count on the event loop
+            job.add_done_callback(lambda _: loop.call_soon_threadsafe(one_done))
+
+request_limiter = RequestLimiter(int(os.getenv("MAX_INFLIGHT_REQUESTS", SCORING_WORKERS * 8)))
+
+async def run_scoring(fn):
+    """Run `fn` on the scoring pool; the calling request's slots are held until it finishes"""
+    job = scoring_executor.submit(fn)
+    request_limiter.track(job)
+    return await asyncio.wrap_future(job)
+
+async def recommend_async(query, index, k, filters=None):
+    """
+    Non-blocking recommendation: LLM classification (I/O) is awaited on the
+    event loop when the engine has it; scoring goes to the scoring pool.
+    """
+    kwargs = {"filters": filters}
+    if hasattr(engine, "classify_query_async"):
+        kwargs["classification"] = await engine.classify_query_async(query)
+    return await run_scoring(partial(get_recommendations, query, index, k, **kwargs))
+
+def json_response(body: bytes) -> Response:
+    """
+    Send an already-encoded body. Items are validated and encoded once when
+    the catalog is indexed (catalog.CatalogRecord), so this skips FastAPI's
+    per-request response_model validation and serialization; response_model
+    stays on the routes for the OpenAPI schema.
+    """
+    return Response(content=body, media_type="application/json")
 
 @app.on_event("startup")
 async def startup_event():
-    global db_instance
     print("Initializing RAG Engine...")
     
-    # Check if data exists, if not, scrape
-    data_path = "../data/shl_catalog.json"
-    if not os.path.exists(data_path):
+    # Worker started by app.serve: attach to the index its launcher published
+    shared_index = os.getenv("SHL_SHARED_INDEX")
+    if shared_index and hasattr(engine, "TfidfIndex"):
+        from .shared_index import attach_index
+        catalog_manager.set_index(attach_index(shared_index))
+        print(f"Engine Ready (shared index '{shared_index}').")
+        return
+    
+    # Check if data exists (an old JSON array catalog is converted), if not, scrape
+    migrate_legacy_catalog()
+    if not os.path.exists(CATALOG_PATH):
         print("Data not found. Running scraper first...")
         run_scraper()
         
-    # Build/Load Vector DB
-    # Note: In production, you'd load a persisted DB rather than rebuilding
-    db_instance = build_index()
+    # Map the compiled index (python -m app.index_file) when it matches the
+    # catalog, otherwise build it; the watcher rebuilds when the catalog changes
+    compiled = None
+    if hasattr(engine, "TfidfIndex"):
+        from .index_file import open_index_file
+        compiled = open_index_file(catalog_path=CATALOG_PATH)
+    if compiled is not None:
+        catalog_manager.set_index(compiled)
+        print(f"Compiled index mapped: {len(compiled)} items")
+    else:
+        catalog_manager.load()
+    catalog_manager.start()
     print("Engine Ready.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    catalog_manager.stop()
+    if hasattr(engine, "query_embedding_cache"):
+        engine.query_embedding_cache.flush()
+    scoring_executor.shutdown(wait=False)
+
 @app.get("/health")
 def health_check():
     """
@@ -46,23 +190,73 @@ def health_check():
     """
     return {"status": "healthy"}
 
+@app.get("/stats")
+def index_stats():
+    """
+    Index Stats Endpoint
+    Returns build-time statistics of the live index (size, vocabulary, build time)
+    """
+    stats = dict(getattr(catalog_manager.index, "stats", {}))
+    stats["catalog_version"] = catalog_manager.version
+    stats["result_cache"] = result_cache.stats()
+    if hasattr(engine, "query_embedding_cache"):
+        stats["query_embedding_cache"] = engine.query_embedding_cache.stats()
+    stats["requests"] = {
+        "in_flight": request_limiter.in_flight,
+        "limit": request_limiter.limit,
+        "rejected": request_limiter.rejected,
+        "scoring_workers": SCORING_WORKERS,
+    }
+    return stats
+
 @app.post("/recommend", response_model=RecommendationResponse)
-def recommend_assessments(request: QueryRequest):
+async def recommend_assessments(request: QueryRequest):
     """
     Assessment Recommendation Endpoint
-    Accepts: JSON { "query": "..." }
+    Accepts: JSON { "query": "...", optional filters: "max_duration", "remote_support",
+                    "adaptive_support", "test_type" }
     Returns: JSON { "recommended_assessments": [ ... ] }
     """
+    with request_limiter.admit():
+        return await _recommend(request)
+
+async def _recommend(request: QueryRequest):
     try:
-        # Simple engine doesn't need db_instance, it loads data directly
-        results = get_recommendations(request.query, db_instance)
-        return {"recommended_assessments": results}
+        # Grab the live index once so a concurrent swap cannot affect this request
+        index, version = catalog_manager.snapshot()
+        results = await cached_recommendations_async(result_cache, recommend_async, request.query, index,
+                                                     k=10, version=version, filters=request.to_filters())
+        return json_response(b'{"recommended_assessments":' + encode_items(results) + b'}')
     except Exception as e:
         print(f"Error processing request: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/recommend/batch", response_model=BatchRecommendationResponse)
+async def recommend_assessments_batch(request: BatchQueryRequest):
+    """
+    Batch Recommendation Endpoint
+    Accepts: JSON { "queries": ["...", "..."] } (at most MAX_BATCH_QUERIES queries)
+    Returns: JSON { "results": [ { "recommended_assessments": [ ... ] }, ... ] }
+    """
+    with request_limiter.admit(len(request.queries)):
+        return await _recommend_batch(request)
+
+async def _recommend_batch(request: BatchQueryRequest):
+    try:
+        index, version = catalog_manager.snapshot()
+        batch = await run_scoring(partial(
+            cached_batch_recommendations, result_cache, get_batch_recommendations, request.queries, index,
+            k=10, version=version, filters=request.to_filters()))
+        return json_response(b'{"results":[' + b','.join(
+            b'{"recommended_assessments":' + encode_items(results) + b'}' for results in batch) + b']}')
+    except Exception as e:
+        print(f"Error processing batch request: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
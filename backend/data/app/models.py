@@ -1,10 +1,43 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import os
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Dict
 
-class QueryRequest(BaseModel):
+from .utils import category_mask
+
+# Longest batch /recommend/batch accepts (longer ones get a 422)
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", 32))
+
+class RecommendationFilters(BaseModel):
+    """
+    Optional structured filters, applied to the catalog before similarity scoring.
+    """
+    max_duration: Optional[int] = Field(None, ge=0, description="Maximum duration in minutes (items with unknown duration are kept)")
+    remote_support: Optional[str] = Field(None, pattern="^(Yes|No)$", description="Only 'Yes' or only 'No' remote support")
+    adaptive_support: Optional[str] = Field(None, pattern="^(Yes|No)$", description="Only 'Yes' or only 'No' adaptive support")
+    test_type: Optional[List[str]] = Field(None, description="Any of: knowledge, personality, ability, cognitive, simulations, other")
+
+    @field_validator("test_type")
+    @classmethod
+    def check_test_type(cls, value):
+        if value:
+            category_mask(value)
+        return value
+
+    def to_filters(self) -> Optional[Dict]:
+        """Filters in the form the engines take, or None when nothing is set"""
+        filters = {
+            "max_duration": self.max_duration,
+            "remote_support": self.remote_support,
+            "adaptive_support": self.adaptive_support,
+            "categories": category_mask(self.test_type) if self.test_type else None,
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+        return filters or None
+
+class QueryRequest(RecommendationFilters):
     """
     Request model for the recommendation endpoint.
-    Strictly follows Appendix 2[cite: 169].
+    Strictly follows Appendix 2[cite: 169]; the filter fields are optional extras.
     """
     query: str = Field(..., description="The natural language query or job description text")
 
@@ -25,4 +58,18 @@ class RecommendationResponse(BaseModel):
     """
     Wrapper for the list of recommendations.
     """
-    recommended_assessments: List[AssessmentItem]
\ No newline at end of file
+    recommended_assessments: List[AssessmentItem]
+
+class BatchQueryRequest(RecommendationFilters):
+    """
+    Request model for the batch recommendation endpoint.
+    Filters apply to every query in the batch.
+    """
+    queries: List[str] = Field(..., max_length=MAX_BATCH_QUERIES,
+                               description=f"Natural language queries or job description texts (at most {MAX_BATCH_QUERIES})")
+
+class BatchRecommendationResponse(BaseModel):
+    """
+    Recommendations for each query, in the same order as the request.
+    """
+    results: List[RecommendationResponse]
\ No newline at end of file
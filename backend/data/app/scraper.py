@@ -4,33 +4,291 @@ import json
 import time
 import re
 import os
+import hashlib
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from requests.adapters import HTTPAdapter
 from .utils import clean_text, extract_duration, normalize_yes_no, format_test_type
+from .catalog import CatalogWriter, load_catalog, write_catalog, apply_change_set, CATALOG_PATH
 
 # Configuration
-BASE_URL = "https://www.shl.com/solutions/products/product-catalog/"
-OUTPUT_FILE = "../data/shl_catalog.json"
+BASE_URL = os.getenv("SHL_BASE_URL", "https://www.shl.com/solutions/products/product-catalog/")
+OUTPUT_FILE = CATALOG_PATH
+# Incremental mode: per-URL validators/hashes, and the change set it emits
+CRAWL_STATE_FILE = "../data/crawl_state.json"
+CHANGES_FILE = "../data/catalog_changes.json"
 MIN_REQUIRED_ITEMS = 377
 
-def get_soup(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+# Crawl politeness: concurrent requests in flight, and a per-host token bucket
+# (sustained requests/second plus a small burst)
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 8))
+SCRAPER_RATE = float(os.getenv("SCRAPER_RATE", 10))
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", 10))
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", 3))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A catalog page answering with these is past the last page
+END_OF_CATALOG_STATUSES = {404, 410}
+
+# Parse stage: product pages are parsed in worker processes, fed through a
+# bounded queue so fetching never waits on parsing unless the queue is full
+SCRAPER_PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", os.cpu_count() or 1))
+SCRAPER_PARSE_QUEUE = int(os.getenv("SCRAPER_PARSE_QUEUE", 64))
+
+try:
+    # C parser, much faster than html.parser; product pages are read with
+    # XPath straight from its tree, without building a BeautifulSoup one
+    from lxml import etree, html as lxml_html
+    HTML_PARSER = "lxml"
+except ImportError:
+    lxml_html = None
+    HTML_PARSER = "html.parser"
+
+# Tags whose text never holds assessment metadata
+_SKIP_TAGS = ["script", "style", "noscript", "nav", "header", "footer"]
+# Product page containers: the description block, and the regions holding
+# the metadata (main content plus sidebars, which sit outside <main>)
+_DESCRIPTION_CLASSES = ["product-description", "content-block"]
+_DESCRIPTION_XPATH = [
+    f"//div[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]" for name in _DESCRIPTION_CLASSES
+]
+_METADATA_XPATH = "//main | //aside[not(ancestor::main)]"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, bursting up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Fetcher:
+    """
+    Shared HTTP client for the crawl: one pooled keep-alive session, a token
+    bucket per host, and retries with exponential backoff on connection
+    errors and 429/5xx responses (honouring Retry-After).
+    """
+
+    def __init__(self, concurrency: int = SCRAPER_CONCURRENCY, rate: float = SCRAPER_RATE,
+                 burst: int = SCRAPER_BURST, retries: int = SCRAPER_RETRIES, backoff: float = 0.5):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def get(self, url: str, headers=None):
+        """GET with rate limiting and retries; returns the last response, or None if unreachable"""
+        bucket = self._bucket(url)
+        response = None
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=10)
+            except requests.RequestException as e:
+                print(f"Error fetching {url}: {e}")
+                response = None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+            if attempt < self.retries:
+                time.sleep(self._retry_delay(response, attempt))
+        return response
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt)
+
+    def close(self):
+        self.session.close()
+
+
+class CrawlState:
+    """
+    What the last incremental crawl saw: for every fetched URL its ETag,
+    Last-Modified and body hash plus the extracted result (product links for
+    catalog pages, details for product pages), and the products it produced.
+    Unchanged pages (304 or identical body) are answered from here without
+    being parsed again.
+    """
+
+    def __init__(self, path: str = CRAWL_STATE_FILE):
+        self.path = path
+        self.pages = {}
+        self.products = {}
+        # Cleared when a catalog page could not be loaded (unreachable or
+        # 5xx after retries) or the crawl stopped at its item cap: it then
+        # did not see every product, so nothing may be reported as removed
+        self.complete = True
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.pages = saved.get("pages", {})
+            self.products = saved.get("products", {})
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"pages": self.pages, "products": self.products}, f)
+        os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url: str) -> dict:
+        entry = self.pages.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def fetch(self, url: str, fetcher):
+        """
+        Conditional GET of `url`. Returns (body, entry, status): body is None
+        when the page is unchanged (reuse entry's stored result) or could not
+        be fetched (entry is then the previous one, or None); status is the
+        HTTP status, or None when the server was unreachable.
+        """
+        with self._lock:
+            entry = self.pages.get(url)
+        response = fetcher.get(url, headers=self.conditional_headers(url))
+        status = response.status_code if response is not None else None
+        if status != 200 and not (status == 304 and entry):
+            return None, entry, status
+        validators = {
+            "etag": response.headers.get("ETag", entry.get("etag") if entry else None),
+            "last_modified": response.headers.get("Last-Modified", entry.get("last_modified") if entry else None),
         }
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return BeautifulSoup(response.content, 'html.parser')
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
+        if response.status_code == 304:
+            entry = dict(entry, **validators)
+            self.record(url, entry)
+            return None, entry, status
+        digest = hashlib.sha1(response.content).hexdigest()
+        if entry and entry.get("sha1") == digest:
+            entry = dict(entry, **validators)
+            self.record(url, entry)
+            return None, entry, status
+        return response.content, dict(validators, sha1=digest), status
+
+    def record(self, url: str, entry: dict):
+        with self._lock:
+            self.pages[url] = entry
+
+    def forget(self, url: str):
+        with self._lock:
+            self.pages.pop(url, None)
+
+
+_default_fetcher = None
+
+
+def fetch_body(url, fetcher=None):
+    """Body of a 200 response, or None"""
+    global _default_fetcher
+    if fetcher is None:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        fetcher = _default_fetcher
+    response = fetcher.get(url)
+    if response is not None and response.status_code == 200:
+        return response.content
     return None
 
-def scrape_details(product_url):
+def get_soup(url, fetcher=None):
+    body = fetch_body(url, fetcher)
+    return BeautifulSoup(body, HTML_PARSER) if body is not None else None
+
+def scrape_details(product_url, fetcher=None):
     """
     Deep crawl of a specific assessment page to get metadata.
     """
-    soup = get_soup(product_url)
-    if not soup:
+    body = fetch_body(product_url, fetcher)
+    if body is None:
         return {}
+    return parse_details_html(body)
+
+def parse_details_html(html):
+    """
+    Metadata of an assessment from its product page HTML.
+    Top-level so it can run in the parse worker processes.
+    """
+    if lxml_html is None:
+        return parse_details(BeautifulSoup(html, HTML_PARSER))
+    root = lxml_html.fromstring(html)
+    etree.strip_elements(root, *_SKIP_TAGS, with_tail=False)
+    description = None
+    for xpath in _DESCRIPTION_XPATH:
+        found = root.xpath(xpath)
+        if found:
+            description = "".join(text.strip() for text in found[0].itertext())
+            break
+    # Pages without <main>/<aside> fall back to the whole body
+    regions = root.xpath(_METADATA_XPATH) or root.xpath("//body") or [root]
+    text_content = " ".join(" ".join(text for region in regions for text in region.itertext()).split())
+    return details_from_text(description, text_content)
+
+def parse_details(soup):
+    """Metadata of an assessment from its parsed product page"""
+    # (Selectors based on common SHL page structures - may need adjustment if site updates)
+    description = None
+    for name in _DESCRIPTION_CLASSES:
+        desc_tag = soup.find('div', class_=name)
+        if desc_tag:
+            description = desc_tag.get_text(strip=True)
+            break
 
+    # SHL often lists metadata in a sidebar or specific list format, so
+    # keywords are looked for in the main content and any sidebars, with
+    # site chrome and scripts dropped first
+    for tag in soup.find_all(_SKIP_TAGS):
+        tag.decompose()
+    regions = soup.find_all('main')
+    regions += [aside for aside in soup.find_all('aside') if aside.find_parent('main') is None]
+    if not regions:
+        regions = [soup.body or soup]
+    text_content = " ".join(region.get_text(" ", strip=True) for region in regions)
+    return details_from_text(description, text_content)
+
+def details_from_text(description, text_content):
+    """Details dict from a page's description and the text of its metadata regions"""
     details = {
         "description": "No description available.",
         "duration": 0,
@@ -40,16 +298,12 @@ def scrape_details(product_url):
     }
 
     # Scrape Description
-    # (Selectors based on common SHL page structures - may need adjustment if site updates)
-    desc_tag = soup.find('div', class_='product-description') or soup.find('div', class_='content-block')
-    if desc_tag:
-        details['description'] = desc_tag.get_text(strip=True)
+    if description:
+        details['description'] = description
 
     # Scrape Metadata Table/List
-    # SHL often lists these in a sidebar or specific list format
     # We look for keywords since classes change
-    text_content = soup.get_text(" ", strip=True)
-    
+
     # Extract Duration
     # Regex for "X mins" or "X minutes"
     dur_match = re.search(r'(\d+)\s*min', text_content, re.IGNORECASE)
@@ -75,80 +329,254 @@ def scrape_details(product_url):
 
     return details
 
-def run_scraper():
-    print("Starting SHL Catalog Scraper...")
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    
-    products = []
+def find_product_links(soup, page_url):
+    """(title, absolute url) of the individual assessments linked from a catalog page"""
+    links = []
+    # Selector assumes generic anchor tags inside catalog list items.
+    # You may need to inspect the live site for exact class, e.g., 'a.product-link'
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        title = link.get_text(strip=True)
+
+        # Filter: Must be a product view url and NOT pre-packaged
+        if "/product-catalog/view/" in href and title:
+            full_url = urljoin(page_url, href)
+
+            # Constraint: Ignore "Pre-packaged Job Solutions"
+            # This is often filtered by checking the category text or URL patterns
+            if "job-solution" in full_url or "packaged" in title.lower():
+                continue
+            links.append((title, full_url))
+    return links
+
+def build_product(title, url, details):
+    if not details:
+        print(f"No details for {url}; keeping it with defaults")
+    return {
+        "name": title,
+        "url": url,
+        "description": details.get('description', "No description available."),
+        "duration": details.get('duration', 0),
+        "test_type": details.get('test_type', ["General"]),
+        "adaptive_support": details.get('adaptive_support', "No"),
+        "remote_support": details.get('remote_support', "Yes")
+    }
+
+def fetch_links(url, fetcher, state=None):
+    """Product links of a catalog page, or None if it could not be fetched"""
+    if state is None:
+        soup = get_soup(url, fetcher)
+        return find_product_links(soup, url) if soup else None
+    body, entry, status = state.fetch(url, fetcher)
+    if status in END_OF_CATALOG_STATUSES:
+        # Past the last page: the normal end of pagination
+        state.forget(url)
+        return None
+    if body is None:
+        if status not in (200, 304):
+            # Unreachable or failing after retries: its products were not seen
+            state.complete = False
+        if entry is None or "links" not in entry:
+            return None
+        return [tuple(link) for link in entry["links"]]
+    links = find_product_links(BeautifulSoup(body, HTML_PARSER), url)
+    entry["links"] = links
+    state.record(url, entry)
+    return links
+
+def crawl(base_url=BASE_URL, fetcher=None, concurrency=SCRAPER_CONCURRENCY, max_items=MIN_REQUIRED_ITEMS + 50,
+          state=None, parse_workers=SCRAPER_PARSE_WORKERS):
+    """
+    Walk the catalog pages in order and crawl product pages as a pipeline:
+    up to `concurrency` fetcher threads put raw pages on a bounded queue and
+    `parse_workers` processes parse them, so network concurrency is never
+    held up by parsing. Products keep the order they were discovered in.
+    With a CrawlState, every request is conditional and unchanged pages are
+    not parsed again.
+
+    Yields products in discovery order as soon as they (and everything
+    discovered before them) are done, so callers can write them out while
+    the crawl is still running.
+    """
+    fetcher = fetcher or Fetcher(concurrency=concurrency)
+    parse_workers = max(parse_workers, 1)
     seen_urls = set()
-    page = 1
-    
-    # Pagination loop
-    while True:
-        print(f"Scraping Page {page}...")
-        url = f"{BASE_URL}?page={page}"
-        soup = get_soup(url)
-        
-        if not soup:
-            break
-            
-        # Find product links. 
-        # Selector assumes generic anchor tags inside catalog list items.
-        # You may need to inspect the live site for exact class, e.g., 'a.product-link'
-        links = soup.find_all('a', href=True)
-        found_on_page = 0
-        
-        for link in links:
-            href = link['href']
-            title = link.get_text(strip=True)
-            
-            # Filter: Must be a product view url and NOT pre-packaged
-            if "/product-catalog/view/" in href and title:
-                full_url = href if href.startswith("http") else f"https://www.shl.com{href}"
-                
-                if full_url in seen_urls:
-                    continue
-                    
-                # Constraint: Ignore "Pre-packaged Job Solutions"
-                # This is often filtered by checking the category text or URL patterns
-                if "job-solution" in full_url or "packaged" in title.lower():
-                    continue
-
-                seen_urls.add(full_url)
-                
-                # Fetch details
-                details = scrape_details(full_url)
-                
-                product = {
-                    "name": title,
-                    "url": full_url,
-                    "description": details['description'],
-                    "duration": details['duration'],
-                    "test_type": details['test_type'],
-                    "adaptive_support": details['adaptive_support'],
-                    "remote_support": details['remote_support']
-                }
-                
-                products.append(product)
-                found_on_page += 1
-                
-                # Politeness delay
-                time.sleep(0.2)
-        
-        if found_on_page == 0:
-            print("No more products found. Stopping.")
-            break
-            
-        page += 1
-        print(f"Total collected: {len(products)}")
-        if len(products) >= MIN_REQUIRED_ITEMS + 50: # Buffer
-            break
+    discovered = []  # (title, url) in discovery order
+    emitted = 0      # products of `discovered` already yielded
+    details = {}     # url -> details, filled in by either stage
+    in_flight = threading.BoundedSemaphore(concurrency)
+    parse_queue = queue.Queue(maxsize=SCRAPER_PARSE_QUEUE)
+
+    def fetch_stage(url):
+        try:
+            if state is None:
+                body, entry = fetch_body(url, fetcher), None
+            else:
+                body, entry, _ = state.fetch(url, fetcher)
+        finally:
+            in_flight.release()
+        if body is None:
+            # Unchanged (reuse what was parsed last time) or unreachable
+            details[url] = entry.get("details", {}) if entry else {}
+        else:
+            # Blocks only when the parse stage is a full queue behind
+            parse_queue.put((url, body, entry))
+
+    def parse_stage(parse_pool):
+        while True:
+            job = parse_queue.get()
+            if job is None:
+                return
+            url, body, entry = job
+            try:
+                result = parse_pool.submit(parse_details_html, body).result()
+            except Exception as e:
+                print(f"Error parsing {url}: {e}")
+                result = {}
+            details[url] = result
+            if state is not None:
+                entry["details"] = result
+                state.record(url, entry)
+
+    # Spawned workers: the crawl may run in a process that already has threads
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+    parsers = [threading.Thread(target=parse_stage, args=(parse_pool,), name=f"scraper-parse-{i}", daemon=True)
+               for i in range(parse_workers)]
+    for thread in parsers:
+        thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scraper") as fetch_pool:
+            page = 1
+            # Pagination loop
+            while len(discovered) < max_items:
+                print(f"Scraping Page {page}...")
+                url = f"{base_url}?page={page}"
+                links = fetch_links(url, fetcher, state)
+
+                if links is None:
+                    break
+
+                found_on_page = 0
+                for title, full_url in links:
+                    if full_url in seen_urls:
+                        continue
+                    seen_urls.add(full_url)
+                    # Blocks while `concurrency` detail fetches are already running
+                    in_flight.acquire()
+                    fetch_pool.submit(fetch_stage, full_url)
+                    discovered.append((title, full_url))
+                    found_on_page += 1
+
+                if found_on_page == 0:
+                    print("No more products found. Stopping.")
+                    break
+
+                page += 1
+                print(f"Total collected: {len(discovered)}")
+                while emitted < len(discovered) and discovered[emitted][1] in details:
+                    title, url = discovered[emitted]
+                    yield build_product(title, url, details[url])
+                    emitted += 1
+            else:
+                # Stopped at max_items, not at the end of the catalog
+                if state is not None:
+                    state.complete = False
+    finally:
+        # Fetching is done once the pool has drained; then stop the parsers
+        for _ in parsers:
+            parse_queue.put(None)
+        for thread in parsers:
+            thread.join()
+        parse_pool.shutdown()
+
+    for title, url in discovered[emitted:]:
+        yield build_product(title, url, details.get(url, {}))
+
+def run_scraper(base_url=BASE_URL, output_file=OUTPUT_FILE, concurrency=SCRAPER_CONCURRENCY):
+    print("Starting SHL Catalog Scraper...")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    start = time.perf_counter()
+    fetcher = Fetcher(concurrency=concurrency)
+    try:
+        # Items are appended as they are crawled; the file replaces the
+        # catalog in one rename at the end, so a running server reloads a
+        # complete file (an interrupted crawl leaves <output_file>.partial)
+        with CatalogWriter(output_file) as writer:
+            for product in crawl(base_url, fetcher, concurrency):
+                writer.write(product)
+    finally:
+        fetcher.close()
+
+    print(f"Scraping complete. {writer.count} items saved to {output_file} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+def diff_products(previous, current):
+    """
+    Change set between two {url: product} maps: added and updated products
+    in crawl order, and the URLs of removed ones.
+    """
+    return {
+        "added": [item for url, item in current.items() if url not in previous],
+        "updated": [item for url, item in current.items() if url in previous and previous[url] != item],
+        "removed": [url for url in previous if url not in current],
+    }
+
+def run_incremental_crawl(base_url=BASE_URL, state_file=CRAWL_STATE_FILE, changes_file=CHANGES_FILE,
+                          concurrency=SCRAPER_CONCURRENCY, apply_to=None, fetcher=None):
+    """
+    Re-crawl with conditional requests against the saved crawl state and
+    write only what changed to `changes_file` (see diff_products). The
+    catalog is left alone unless `apply_to` names a catalog file to merge
+    the change set into. The first run has no state, so everything is "added".
+    A `fetcher` passed in (e.g. with other rate limits) is left open.
+    """
+    print("Starting incremental SHL Catalog crawl...")
+    start = time.perf_counter()
+    state = CrawlState(state_file)
+    own_fetcher = fetcher is None
+    fetcher = fetcher or Fetcher(concurrency=concurrency)
+    try:
+        products = list(crawl(base_url, fetcher, concurrency, state=state))
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+    current = {item["url"]: item for item in products}
+    changes = diff_products(state.products, current)
+    if not state.complete:
+        # Products on pages we failed to load, or past the item cap, are not gone
+        print("Crawl did not cover the whole catalog; not reporting removals")
+        changes["removed"] = []
+        current = dict(state.products, **current)
+    for url in changes["removed"]:
+        state.pages.pop(url, None)
+    state.products = current
+    state.save()
+
+    tmp_path = f"{changes_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(changes, f, indent=2)
+    os.replace(tmp_path, changes_file)
+    print(f"Incremental crawl complete in {time.perf_counter() - start:.1f}s: "
+          f"{len(changes['added'])} added, {len(changes['updated'])} updated, "
+          f"{len(changes['removed'])} removed -> {changes_file}")
 
-    # Save to JSON
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(products, f, indent=2)
-    
-    print(f"Scraping complete. {len(products)} items saved to {OUTPUT_FILE}")
+    if apply_to and any(changes.values()):
+        catalog = load_catalog(apply_to) if os.path.exists(apply_to) else []
+        write_catalog(apply_to, apply_change_set(catalog, changes))
+        print(f"Applied changes to {apply_to}")
+    return changes
 
 if __name__ == "__main__":
-    run_scraper()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Scrape the SHL product catalog")
+    parser.add_argument("--incremental", action="store_true",
+                        help="conditional re-crawl that writes a change set instead of the full catalog")
+    parser.add_argument("--apply", action="store_true",
+                        help="with --incremental, also merge the change set into the catalog file")
+    args = parser.parse_args()
+    if args.incremental:
+        run_incremental_crawl(apply_to=OUTPUT_FILE if args.apply else None)
+    else:
+        run_scraper()
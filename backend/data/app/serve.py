@@ -0,0 +1,71 @@
+"""
+Multi-process serving with one shared TF-IDF index.
+
+    python -m app.serve --workers 4
+
+Builds the index once, publishes it to shared memory and starts uvicorn
+with the requested number of workers; each worker attaches to the shared
+arrays instead of loading the catalog itself. Catalog changes need a
+restart of this launcher (workers do not hot-reload in this mode).
+
+With RECOMMENDER_ENGINE=ml the launcher brings the persisted vector DB up to
+date first, in a child process so it does not keep the embedding model
+loaded; workers then find it current and open it without embedding anything.
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import uvicorn
+
+from .engine import build_index
+from .catalog import iter_catalog, migrate_legacy_catalog, CATALOG_PATH
+from .index_file import open_index_file
+from .shared_index import publish_index, SHARED_INDEX_ENV
+
+
+def _build_vector_db():
+    from . import engine_ml
+    engine_ml.build_index()
+
+
+def prepare_vector_db():
+    """Build the ML engine's vector DB once, before any worker starts"""
+    if not os.path.exists(CATALOG_PATH):
+        print(f"Catalog not found at {CATALOG_PATH}; workers will build the vector DB")
+        return
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        pool.submit(_build_vector_db).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several workers sharing one index")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+    migrate_legacy_catalog()
+
+    if os.getenv("RECOMMENDER_ENGINE", "tfidf").lower() == "ml":
+        print("Shared-memory serving covers the TF-IDF engine only; "
+              "ML workers load their own model and open the persisted vector DB.")
+        prepare_vector_db()
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+        return
+
+    index = open_index_file(catalog_path=CATALOG_PATH) or build_index(iter_catalog(CATALOG_PATH))
+    shm = publish_index(index)
+    print(f"Published index to shared memory '{shm.name}' ({shm.size} bytes)")
+    # Workers are spawned as fresh processes and inherit the environment
+    os.environ[SHARED_INDEX_ENV] = shm.name
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    main()
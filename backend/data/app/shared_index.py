@@ -0,0 +1,48 @@
+"""
+Share one built TF-IDF index between server worker processes.
+
+The launcher builds the index once and copies its arrays into a single
+`multiprocessing.shared_memory` block; workers attach to that block and wrap
+NumPy views around it, so the vectors exist once in RAM however many workers
+run. Only the vocabulary and the records' response JSON are decoded per worker.
+
+The block uses the same layout as the compiled index file (index_file.py).
+"""
+from multiprocessing import shared_memory
+
+from .engine import TfidfIndex
+from .index_file import pack_index, write_packed, index_from_buffer
+
+SHARED_INDEX_ENV = "SHL_SHARED_INDEX"
+
+
+def publish_index(index: TfidfIndex) -> shared_memory.SharedMemory:
+    """
+    Copy the index into a new shared memory block and return it.
+    The caller owns the block: keep it alive while workers run, then
+    close() and unlink() it.
+    """
+    header, arrays, layout, size = pack_index(index)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    write_packed(shm.buf, header, arrays, layout)
+    return shm
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    try:
+        # Python 3.13+: attaching must not register the block for cleanup
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older Pythons register every attach with the resource tracker. Workers
+        # spawned by app.serve share the launcher's tracker, so this is a no-op
+        # there and the launcher stays the one that unlinks the block.
+        return shared_memory.SharedMemory(name=name)
+
+
+def attach_index(name: str) -> TfidfIndex:
+    """Attach to a published index; the arrays are read-only zero-copy views"""
+    shm = _open_block(name)
+    index = index_from_buffer(shm.buf)
+    # The views borrow the block's buffer; keep it open as long as the index lives
+    index.shared_block = shm
+    return index
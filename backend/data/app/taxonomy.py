@@ -0,0 +1,73 @@
+"""
+Keyword taxonomy for heuristic query classification.
+The keyword lists live in query_keywords.json and are compiled once into a
+single trie-shaped regex, so one scan of the query finds every keyword
+regardless of how many terms the taxonomy holds.
+"""
+import json
+import os
+import re
+from typing import Dict, List
+
+TAXONOMY_FILE = os.path.join(os.path.dirname(__file__), "query_keywords.json")
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Regex for a keyword trie; alternatives share prefixes and prefer the longest match"""
+    end = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch != ""]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if end:
+        return "(?:" + body + ")?"
+    return body
+
+
+class KeywordMatcher:
+    """
+    Matches keywords as case-insensitive substrings (the heuristic's historic
+    semantics, e.g. 'java' also fires inside 'javascript').
+    """
+
+    def __init__(self, taxonomy: Dict[str, List[str]]):
+        self.categories = {}  # keyword -> set of categories
+        for category, keywords in taxonomy.items():
+            for kw in keywords:
+                self.categories.setdefault(kw.lower(), set()).add(category)
+        
+        trie = {}
+        for kw in self.categories:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        # Zero-width lookahead so matches at every position are reported,
+        # including keywords overlapping each other
+        self.pattern = re.compile("(?=(" + _trie_pattern(trie) + "))") if trie else None
+        # The regex reports the longest keyword at a position; shorter
+        # keywords that are prefixes of it matched there too
+        self.prefixes = {
+            kw: [other for other in self.categories if kw.startswith(other)]
+            for kw in self.categories
+        }
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """Map each matched category to the keywords found in `text`"""
+        found = set()
+        if self.pattern is not None:
+            for m in self.pattern.finditer(text.lower()):
+                term = m.group(1)
+                if term:
+                    found.update(self.prefixes[term])
+        
+        matches = {}
+        for kw in found:
+            for category in self.categories[kw]:
+                matches.setdefault(category, []).append(kw)
+        return {category: sorted(terms) for category, terms in matches.items()}
+
+
+def load_matcher(path: str = TAXONOMY_FILE) -> KeywordMatcher:
+    with open(path, 'r', encoding='utf-8') as f:
+        return KeywordMatcher(json.load(f))
@@ -16,6 +16,14 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text.lower()
 
+def normalize_query(text: str) -> str:
+    """
+    Cache key for a query: lowercased, whitespace collapsed.
+    Unlike clean_text it keeps every other character, so queries that differ
+    only in accents, symbols or non-Latin script never share a key.
+    """
+    return " ".join((text or "").lower().split())
+
 def extract_duration(duration_str: Union[str, int]) -> int:
     """
     Parses duration string to integer minutes.
@@ -56,4 +64,61 @@ def format_test_type(test_types: Union[str, List[str]]) -> List[str]:
         # Handle comma-separated strings
         return [t.strip() for t in test_types.split(',') if t.strip()]
         
-    return ["General"]
\ No newline at end of file
+    return ["General"]
+
+# Test-type categories as bit flags, computed once per catalog item so result
+# balancing and filtering are integer operations instead of string scans
+CATEGORY_KNOWLEDGE = 1 << 0
+CATEGORY_PERSONALITY = 1 << 1
+CATEGORY_ABILITY = 1 << 2
+CATEGORY_COGNITIVE = 1 << 3
+CATEGORY_SIMULATIONS = 1 << 4
+CATEGORY_OTHER = 1 << 5
+
+CATEGORY_BITS = {
+    "knowledge": CATEGORY_KNOWLEDGE,
+    "personality": CATEGORY_PERSONALITY,
+    "ability": CATEGORY_ABILITY,
+    "cognitive": CATEGORY_COGNITIVE,
+    "simulations": CATEGORY_SIMULATIONS,
+    "other": CATEGORY_OTHER,
+}
+
+# Substrings of the joined test types that put an item in each category
+_CATEGORY_KEYWORDS = [
+    (CATEGORY_KNOWLEDGE, ("knowledge", "skills")),
+    (CATEGORY_PERSONALITY, ("personality", "behavior")),
+    (CATEGORY_ABILITY, ("ability", "aptitude")),
+    (CATEGORY_COGNITIVE, ("cognitive", "reasoning")),
+    (CATEGORY_SIMULATIONS, ("simulation",)),
+]
+
+_BALANCING_CATEGORIES = CATEGORY_KNOWLEDGE | CATEGORY_PERSONALITY | CATEGORY_ABILITY | CATEGORY_COGNITIVE
+
+def test_type_mask(test_types: Union[str, List[str]]) -> int:
+    """
+    Bitmask of the categories an item's test types fall into.
+    CATEGORY_OTHER marks items outside the knowledge/personality/ability/
+    cognitive buckets used for balancing.
+    """
+    test_types_str = " ".join(format_test_type(test_types)).lower()
+    mask = 0
+    for bit, keywords in _CATEGORY_KEYWORDS:
+        if any(kw in test_types_str for kw in keywords):
+            mask |= bit
+    if not mask & _BALANCING_CATEGORIES:
+        mask |= CATEGORY_OTHER
+    return mask
+
+def category_mask(names: List[str]) -> int:
+    """
+    Combine category names (e.g. ["knowledge", "personality"]) into a mask.
+    Unknown names raise ValueError.
+    """
+    mask = 0
+    for name in names:
+        key = name.strip().lower()
+        if key not in CATEGORY_BITS:
+            raise ValueError(f"Unknown test type category: {name}")
+        mask |= CATEGORY_BITS[key]
+    return mask
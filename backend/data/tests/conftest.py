@@ -0,0 +1,8 @@
+"""
+Offline checks against local stubs: run with `python -m pytest tests` from
+backend/data. The app modules are imported as `app.*`, like `python -m app.main`.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
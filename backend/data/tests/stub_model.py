@@ -0,0 +1,24 @@
+"""Local stand-in for the Gemini client, for classifying queries without the network."""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubModelClient:
+    """
+    Stands in for the Gemini client (engine_ml.set_model_client): answers
+    every prompt with a fixed classification after `delay` seconds.
+    """
+
+    def __init__(self, classification: dict, delay: float = 0.0):
+        self.classification = classification
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(text=json.dumps(self.classification))
@@ -0,0 +1,117 @@
+"""
+Local stand-in for the SHL product catalog, for crawling without the network.
+
+Catalog pages (`<base>?page=N`) list `per_page` product links each and 404
+past the last page. Product pages carry a description, a duration in <main>
+and test type / adaptive metadata in an <aside>. Every response has an ETag
+and conditional requests get a 304. Paths in `fail_once` answer 503 once,
+paths in `fail_always` every time.
+"""
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+CATALOG_PATH = "/solutions/products/product-catalog/"
+
+
+class StubSite:
+    def __init__(self, products: int = 30, per_page: int = 10):
+        self.products = list(range(products))
+        self.per_page = per_page
+        self.descriptions = {}  # product number -> description override
+        self.fail_once = set()  # paths answered with a 503 the first time
+        self.fail_always = set()
+        self.requests = []      # (path with query, status) in arrival order
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{CATALOG_PATH}"
+
+    @staticmethod
+    def product_path(number: int) -> str:
+        return f"{CATALOG_PATH}view/test-{number}/"
+
+    def product_url(self, number: int) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{self.product_path(number)}"
+
+    def statuses(self, path: str):
+        with self._lock:
+            return [status for requested, status in self.requests if requested == path]
+
+    def product_page(self, number: int) -> str:
+        description = self.descriptions.get(number, f"Assessment number {number}")
+        return (
+            "<html><head><script>var duration = '99 min';</script></head><body>"
+            "<nav>Menu 5 min</nav>"
+            f"<main><div class='product-description'>{description}</div>"
+            f"<p>Approximate Completion Time in minutes = {number % 60 + 1} min</p></main>"
+            f"<aside>Test Type: {'K' if number % 2 else 'P'} Remote Testing: Yes"
+            f"{' Adaptive/IRT' if number % 3 == 0 else ''}</aside>"
+            "</body></html>"
+        )
+
+    def catalog_page(self, page: int):
+        listed = self.products[(page - 1) * self.per_page: page * self.per_page]
+        if page < 1 or not listed:
+            return None
+        links = "".join(f"<li><a href='{self.product_path(n)}'>Test {n}</a></li>" for n in listed)
+        return f"<html><body><ul>{links}</ul></body></html>"
+
+    def respond(self, path: str, query: str, headers):
+        """(status, body, extra headers) for a request"""
+        with self._lock:
+            if path + query in self.fail_always:
+                return 503, "unavailable", {"Retry-After": "0"}
+            if path + query in self.fail_once:
+                self.fail_once.discard(path + query)
+                return 503, "busy", {"Retry-After": "0"}
+        if path.startswith(CATALOG_PATH + "view/"):
+            number = int(path.rstrip("/").rsplit("-", 1)[1])
+            body = self.product_page(number) if number in self.products else None
+        elif path == CATALOG_PATH:
+            body = self.catalog_page(int(parse_qs(query.lstrip("?")).get("page", ["1"])[0]))
+        else:
+            body = None
+        if body is None:
+            return 404, "not found", {}
+        etag = '"%s"' % hashlib.md5(body.encode("utf-8")).hexdigest()
+        if headers.get("If-None-Match") == etag:
+            return 304, "", {"ETag": etag}
+        return 200, body, {"ETag": etag}
+
+    def start(self) -> "StubSite":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = f"?{parts.query}" if parts.query else ""
+                status, body, extra = site.respond(parts.path, query, self.headers)
+                with site._lock:
+                    site.requests.append((parts.path + query, status))
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import pytest
+
+# engine_ml needs the ML stack; the classification cache must not touch ../data
+pytest.importorskip("langchain_community")
+os.environ["CLASSIFICATION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "classification_cache.sqlite3")
+from app import engine_ml  # noqa: E402
+from stub_model import StubModelClient  # noqa: E402
+
+LLM_ANSWER = {"needs_technical": True, "needs_behavioral": True, "needs_cognitive": False, "skill_ratio": 0.3}
+
+
+@pytest.fixture
+def model():
+    def install(delay):
+        client = StubModelClient(LLM_ANSWER, delay=delay)
+        engine_ml.set_model_client(client)
+        return client
+    yield install
+    engine_ml.set_model_client(None)
+
+
+def wait_for_cache(query, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        cached = engine_ml.get_classification_cache().get(engine_ml.classification_key(query))
+        if cached is not None:
+            return cached
+        time.sleep(0.02)
+    return None
+
+
+def test_slow_llm_answers_with_heuristic_then_backfills(model):
+    client = model(delay=0.3)
+    query = "Java developer who mentors the team"
+    assert engine_ml.classify_query(query, budget=0.05) == engine_ml.classify_query_heuristic(query)
+    assert wait_for_cache(query) == LLM_ANSWER
+    # Same query up to case and spacing: served from the cache, no second call
+    assert engine_ml.classify_query("  java developer WHO mentors   the team", budget=0.05) == LLM_ANSWER
+    assert client.calls == 1
+
+
+def test_concurrent_identical_misses_share_one_call(model):
+    client = model(delay=0.3)
+    query = "Sales manager with negotiation skills"
+
+    async def burst():
+        return await asyncio.gather(*[engine_ml.classify_query_async(query, budget=0.05) for _ in range(20)])
+
+    asyncio.run(burst())
+    assert wait_for_cache(query) == LLM_ANSWER
+    assert client.calls == 1
+
+
+def test_full_backlog_skips_the_llm(model, monkeypatch):
+    client = model(delay=0.3)
+    monkeypatch.setattr(engine_ml, "LLM_MAX_PENDING", 1)
+    engine_ml.classify_query("Data analyst with SQL", budget=0.01)
+    query = "Customer support agent"
+    assert engine_ml.classify_query(query, budget=0.01) == engine_ml.classify_query_heuristic(query)
+    assert wait_for_cache("Data analyst with SQL") == LLM_ANSWER
+    assert client.calls == 1
+    assert engine_ml.get_classification_cache().get(engine_ml.classification_key(query)) is None
+
+
+def test_non_latin_queries_do_not_share_a_cache_entry(model):
+    client = model(delay=0.0)
+    for query in ("データサイエンティスト", "営業マネージャー", "Développeur C++", "Développeur C#"):
+        engine_ml.classify_query(query, budget=1.0)
+    assert client.calls == 4
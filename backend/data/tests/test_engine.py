@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.engine import TfidfIndex
+from app.utils import CATEGORY_KNOWLEDGE, CATEGORY_PERSONALITY, CATEGORY_COGNITIVE
+
+WORDS = ["java", "python", "sql", "sales", "manager", "customer", "service", "leadership",
+         "verbal", "numerical", "reasoning", "developer", "analyst", "entry", "level", "senior"]
+TEST_TYPES = ["Knowledge & Skills", "Personality & Behavior", "Ability & Aptitude", "Cognitive", "Simulations"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    # Few distinct words over many items: lots of shared terms and tied scores
+    rng = random.Random(7)
+    catalog = [{
+        "url": f"https://example.com/{n}",
+        "name": " ".join(rng.choices(WORDS, k=rng.randint(1, 4))),
+        "description": "",
+        "duration": rng.choice([0, 10, 20, 30, 45, 60]),
+        "remote_support": rng.choice(["Yes", "No"]),
+        "adaptive_support": rng.choice(["Yes", "No"]),
+        "test_type": rng.sample(TEST_TYPES, rng.randint(1, 2)),
+    } for n in range(300)]
+    return TfidfIndex(catalog)
+
+
+def brute_force(index, query, k, allowed):
+    """Every allowed document sorted by score() desc, then index asc"""
+    scores = index.score(query)
+    doc_ids = np.flatnonzero(allowed) if allowed is not None else np.arange(len(index))
+    order = np.lexsort((doc_ids, -scores[doc_ids]))
+    return doc_ids[order][:k].tolist()
+
+
+QUERIES = ["java developer", "senior sales manager", "python sql analyst", "customer service",
+           "verbal numerical reasoning", "leadership leadership leadership", "entry level",
+           "quantum chemistry", ""]
+FILTERS = [
+    None,
+    {"max_duration": 30},
+    {"remote_support": "Yes"},
+    {"adaptive_support": "No", "categories": CATEGORY_PERSONALITY},
+    {"max_duration": 20, "remote_support": "No", "categories": CATEGORY_KNOWLEDGE | CATEGORY_COGNITIVE},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_search_matches_brute_force_ranking(index, filters, k):
+    allowed = index.filter_mask(filters)
+    for query in QUERIES:
+        assert index.search(query, k, allowed).tolist() == brute_force(index, query, k, allowed), query
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.catalog import load_catalog
+from app.scraper import Fetcher, CrawlState, crawl, run_incremental_crawl
+from stub_site import StubSite, CATALOG_PATH
+
+
+@pytest.fixture
+def site():
+    site = StubSite(products=25, per_page=10).start()
+    yield site
+    site.stop()
+
+
+@pytest.fixture
+def fetcher():
+    # No rate limit or backoff worth waiting for against a local server
+    fetcher = Fetcher(concurrency=4, rate=1000, burst=100, retries=2, backoff=0)
+    yield fetcher
+    fetcher.close()
+
+
+@pytest.fixture
+def crawl_files(site, fetcher, tmp_path):
+    return dict(base_url=site.base_url, state_file=str(tmp_path / "crawl_state.json"),
+                changes_file=str(tmp_path / "catalog_changes.json"),
+                apply_to=str(tmp_path / "shl_catalog.json"), fetcher=fetcher)
+
+
+def test_crawl_keeps_discovery_order_and_retries_503(site, fetcher):
+    retried = [site.product_path(3), site.product_path(17), CATALOG_PATH + "?page=2"]
+    site.fail_once = set(retried)
+
+    products = list(crawl(site.base_url, fetcher, concurrency=4, parse_workers=1))
+
+    assert [item["url"] for item in products] == [site.product_url(n) for n in range(25)]
+    for path in retried:
+        assert site.statuses(path) == [503, 200]
+    # Pagination ends at the 404 after the last page
+    assert site.statuses(CATALOG_PATH + "?page=4") == [404]
+    # Duration from <main>, test type and adaptive from the sidebar; script and nav ignored
+    assert products[3] == {
+        "name": "Test 3",
+        "url": site.product_url(3),
+        "description": "Assessment number 3",
+        "duration": 4,
+        "test_type": ["Knowledge & Skills"],
+        "adaptive_support": "Yes",
+        "remote_support": "Yes",
+    }
+
+
+def test_incremental_recrawl_uses_304_and_emits_change_set(site, crawl_files):
+    first = run_incremental_crawl(**crawl_files)
+    assert [item["url"] for item in first["added"]] == [site.product_url(n) for n in range(25)]
+    assert first["updated"] == [] and first["removed"] == []
+
+    site.requests.clear()
+    assert run_incremental_crawl(**crawl_files) == {"added": [], "updated": [], "removed": []}
+    assert [status for path, status in site.requests if "/view/" in path] == [304] * 25
+
+    site.products.remove(7)
+    site.products.append(40)
+    site.descriptions[3] = "Revised description"
+    changes = run_incremental_crawl(**crawl_files)
+
+    assert changes["removed"] == [site.product_url(7)]
+    assert [item["url"] for item in changes["added"]] == [site.product_url(40)]
+    assert [(item["url"], item["description"]) for item in changes["updated"]] == [
+        (site.product_url(3), "Revised description")
+    ]
+    with open(crawl_files["changes_file"]) as f:
+        assert json.load(f) == changes
+    catalog = {item["url"]: item for item in load_catalog(crawl_files["apply_to"])}
+    assert set(catalog) == {site.product_url(n) for n in site.products}
+    assert catalog[site.product_url(3)]["description"] == "Revised description"
+
+
+def test_unreachable_catalog_page_suppresses_removals(site, crawl_files):
+    run_incremental_crawl(**crawl_files)
+    site.products.remove(22)
+    site.fail_always = {CATALOG_PATH + "?page=3"}
+    assert run_incremental_crawl(**crawl_files)["removed"] == []
+
+    site.fail_always.clear()
+    assert run_incremental_crawl(**crawl_files)["removed"] == [site.product_url(22)]
+
+
+def test_capped_crawl_is_incomplete(site, fetcher, tmp_path):
+    state = CrawlState(str(tmp_path / "crawl_state.json"))
+    products = list(crawl(site.base_url, fetcher, concurrency=4, max_items=10, state=state, parse_workers=1))
+    assert len(products) == 10
+    assert not state.complete
@@ -30,7 +30,7 @@ if [ ! -f "data/.env" ]; then
 fi
 
 # Test if data exists
-if [ ! -f "data/shl_catalog.json" ]; then
+if [ ! -f "data/shl_catalog.ndjson" ] && [ ! -f "data/shl_catalog.json" ]; then
     echo "⚠️  SHL catalog data not found. The scraper will run on first startup."
 fi
 
@@ -6,7 +6,7 @@ import os
 
 # Configuration
 DATASET_PATH = "../backend/data/Gen_AI Dataset.xlsx"
-API_URL = "http://localhost:8000/recommend"
+API_URL = "http://localhost:8000/recommend/batch"
 OUTPUT_FILE = "submission.csv"
 
 def generate_submission_csv():
@@ -30,36 +30,41 @@ def generate_submission_csv():
         print(f"Error loading dataset: {e}")
         sys.exit(1)
     
+    queries = df['Query'].tolist()
+    
+    # Score every test query in a single batch request
+    print(f"\nRequesting recommendations for {len(queries)} queries...")
+    try:
+        response = requests.post(API_URL, json={"queries": queries}, timeout=120)
+    except requests.exceptions.ConnectionError:
+        print(f"  ✗ Connection error: Is the backend running at {API_URL}?")
+        sys.exit(1)
+    except Exception as e:
+        print(f"  ✗ Failed: {e}")
+        sys.exit(1)
+    
+    if response.status_code != 200:
+        print(f"  ✗ API error: HTTP {response.status_code}")
+        sys.exit(1)
+    
+    batch = response.json()['results']
+    
     # Create CSV with proper format
     with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(["Query", "Assessment_url"])
         
-        for index, row in df.iterrows():
-            query_text = row['Query']
+        for index, (query_text, result) in enumerate(zip(queries, batch)):
+            recs = result['recommended_assessments']
             
-            print(f"\nProcessing query {index + 1}/{len(df)}:")
+            print(f"\nQuery {index + 1}/{len(queries)}:")
             print(f"  {query_text[:80]}...")
             
-            try:
-                response = requests.post(API_URL, json={"query": query_text}, timeout=30)
-                
-                if response.status_code == 200:
-                    recs = response.json()['recommended_assessments']
-                    
-                    # Write one row per recommendation (as per submission format)
-                    for rec in recs:
-                        writer.writerow([query_text, rec['url']])
-                    
-                    print(f"  ✓ Generated {len(recs)} recommendations")
-                else:
-                    print(f"  ✗ API error: HTTP {response.status_code}")
-                    
-            except requests.exceptions.ConnectionError:
-                print(f"  ✗ Connection error: Is the backend running at {API_URL}?")
-                sys.exit(1)
-            except Exception as e:
-                print(f"  ✗ Failed: {e}")
+            # Write one row per recommendation (as per submission format)
+            for rec in recs:
+                writer.writerow([query_text, rec['url']])
+            
+            print(f"  ✓ Generated {len(recs)} recommendations")
     
     print("\n" + "="*60)
     print(f"✓ Submission CSV generated: {OUTPUT_FILE}")